@@ -0,0 +1,177 @@
+"""Headless benchmarks for the AppEngine hot paths.
+
+Builds synthetic iron_log.csv files, times the engine against them and prints
+JSON. Only core.py is imported, so no Kivy or display is needed. Each run first
+checks the batch math against the scalar functions.
+
+    python benchmarks/bench_engine.py --out bench.json
+    python benchmarks/bench_engine.py --sizes 1000 --compare bench.json
+"""
+import os
+import sys
+import csv
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import core  # noqa: E402
+
+SIZES = (1000, 100000, 1000000)
+BATCH = 100000  # elements per calculate_* batch
+BURST = 500     # save_log calls per burst
+WEEK = ("Upper Power", "Lower Power", "Push Hyper", "Pull Hyper", "Legs Hyper")  # PHAT order
+
+def write_log(path, rows, seed=0):
+    # Every exercise in EXERCISE_DB, a few sets a day, newest rows last
+    rng = random.Random(seed)
+    names = core.CATALOG.names
+    start = date.today() - timedelta(days=rows // 20 + 1)
+    with open(path, "w", newline="") as f:
+        out = csv.writer(f)
+        out.writerow(core.LOG_HEADER)
+        for i in range(rows):
+            w, r = rng.choice(range(20, 200)) + rng.choice((0, 1.25, 2.5)), rng.randint(1, 15)
+            out.writerow([start + timedelta(days=i // 20), rng.choice(names), w, r, core.calculate_1rm(w, r)])
+
+def measure(fn, repeat=3, setup=None):
+    # Best-of-n wall time, plus the traced peak of one extra run. setup, if
+    # given, runs untimed before each run.
+    best = float("inf")
+    for _ in range(repeat):
+        if setup: setup()
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    if setup: setup()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": round(best, 6), "peak_kb": round(peak / 1024, 1)}
+
+def bench_size(rows, results):
+    with tempfile.TemporaryDirectory() as d:
+        log = os.path.join(d, core.CsvStore.filename)
+        write_log(log, rows)
+        # Cold start every run: a fresh copy of the log with no stats cache or
+        # index, since init_storage writes those. The rotation it may start in
+        # the background is waited for untimed, then timed on its own below.
+        fresh = {}
+        def copy():
+            if fresh.get("engine") and fresh["engine"].rotator: fresh["engine"].rotator.join()
+            fresh["dir"] = tempfile.mkdtemp(dir=d)
+            shutil.copy(log, fresh["dir"])
+        def init():
+            fresh["engine"] = core.AppEngine()
+            fresh["engine"].init_storage(fresh["dir"])
+        results[f"init_storage[{rows}]"] = measure(init, repeat=1, setup=copy)
+        if rows > core.ROTATE_ROWS:
+            def open_store():
+                copy()
+                fresh["store"] = core.CsvStore(os.path.join(fresh["dir"], core.CsvStore.filename))
+                fresh["store"].open()
+            results[f"rotate_log[{rows}]"] = measure(lambda: fresh["store"].rotate(), repeat=1, setup=open_store)
+        engine = core.AppEngine()
+        engine.init_storage(d)
+        if engine.rotator: engine.rotator.join()
+        for mode in core.EXERCISE_DB:
+            results[f"generate[{rows}][{mode}]"] = measure(lambda: engine.generate(mode))
+        cold = core.AppEngine()
+        cold.init_storage(d)
+        # History via the tail reader, as before the index is built
+        cold.last_sets, cold.indexed = {}, False
+        results[f"generate_unindexed[{rows}]"] = measure(lambda: cold.generate("Upper Power"))
+
+        def week():
+            # Same seed each run, so every run draws the same pool options
+            engine.rng.seed(0)
+            engine.pool_picks = {}
+            start = date.today()
+            for day, mode in enumerate(WEEK):
+                engine.record_session(mode, engine.generate(mode, start + timedelta(days=day)))
+        results[f"generate_week[{rows}]"] = measure(week)
+
+        def burst():
+            for i in range(BURST): engine.save_log("Bench Press", 100 + i % 10, 5)
+            engine.flush()
+        results[f"save_log_burst[{rows}]"] = measure(burst)
+
+def bench_math(results):
+    rng = random.Random(1)
+    weights = [rng.uniform(0, 300) for _ in range(BATCH)]
+    reps = [rng.randint(0, 20) for _ in range(BATCH)]
+    results["calculate_1rm_scalar"] = measure(lambda: [core.calculate_1rm(w, r) for w, r in zip(weights, reps)])
+    results["calculate_1rm_batch"] = measure(lambda: core.calculate_1rm_batch(weights, reps))
+    results["calculate_plates_scalar"] = measure(lambda: [core.calculate_plates(w) for w in weights])
+    results["calculate_plates_batch"] = measure(lambda: core.calculate_plates_batch(weights))
+
+def check_math(samples=20000):
+    # The batch functions must agree with the scalar ones: every 1/16 kg up to
+    # MAX_LOAD, random floats, and values a rounding error off a plate boundary
+    rng = random.Random(2)
+    weights = [i / 16 for i in range(core.MAX_LOAD * 16 + 40)]
+    weights += [rng.uniform(-10, core.MAX_LOAD + 10) for _ in range(samples)]
+    weights += [v + d for v in (20, 21.25, 100, 122.5, core.MAX_LOAD)
+                for d in (-1e-9, -1e-12, 1e-12, 1e-9, -0.0005, 0.0005)]
+    weights += [122.49999999999999, 22.499999999999996, float("nan"), float("inf"), "x", None]
+    counts, bad = core.calculate_plates_batch(weights)
+    for i, w in enumerate(weights):
+        text = core.calculate_plates(w)
+        if bad[i]:
+            assert text == "Invalid", (w, text)
+            continue
+        side = core.solve_plates(w).side if text != "Bar Only" else ()
+        assert list(counts[i]) == [side.count(p) for p in core.PLATES], (w, list(counts[i]), side)
+    reps = [rng.randint(0, 20) for _ in weights]
+    out, bad = core.calculate_1rm_batch(weights, reps)
+    for i, (w, r) in enumerate(zip(weights, reps)):
+        assert out[i] == (0 if bad[i] else core.calculate_1rm(w, r)), (w, r, out[i])
+
+def compare(results, baseline, tolerance):
+    # Prints the time ratio per benchmark; returns the names that got slower
+    slower = []
+    for name, base in sorted(baseline.get("results", {}).items()):
+        if name not in results: continue
+        ratio = results[name]["seconds"] / base["seconds"] if base["seconds"] else 1.0
+        flag = "SLOWER" if ratio > tolerance else ""
+        print(f"{name:<50} {ratio:6.2f}x {flag}", file=sys.stderr)
+        if flag: slower.append(name)
+    return slower
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="synthetic log sizes in rows")
+    ap.add_argument("--out", help="write JSON results here (default: stdout)")
+    ap.add_argument("--compare", help="baseline JSON from an earlier --out")
+    ap.add_argument("--tolerance", type=float, default=1.25, help="allowed slowdown ratio vs the baseline")
+    args = ap.parse_args(argv)
+
+    check_math()
+    results = {}
+    for rows in args.sizes: bench_size(rows, results)
+    bench_math(results)
+    report = {
+        "meta": {"python": platform.python_version(), "machine": platform.machine(),
+                 "numpy": bool(core.numpy), "date": date.today().isoformat()},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, "w") as f: f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            return 1 if compare(results, json.load(f), args.tolerance) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""End-to-end check of sync.SyncClient against a local stand-in receiver.
+
+StandInServer implements the receiver side of the sync contract (gzipped JSON
+batches, rows deduped by content), so a client can be tried without a real
+backend. Only core.py and sync.py are imported; no Kivy or network needed.
+
+    python benchmarks/sync_check.py
+"""
+import os
+import sys
+import gzip
+import json
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from core import AppEngine  # noqa: E402
+from sync import SYNC_BATCH, HttpSession, SyncClient  # noqa: E402
+
+class StandInServer(ThreadingHTTPServer):
+    # Local receiver for the sync contract: gunzips each POST, keeps its JSON in
+    # self.batches and dedupes rows by content into self.rows. fail_next answers
+    # that many requests with 503 first, to exercise the retries.
+    def __init__(self, port=0):
+        super().__init__(("127.0.0.1", port), StandInHandler)
+        self.batches, self.rows, self.fail_next, self.paths = [], set(), 0, []
+        self.url = f"http://127.0.0.1:{self.server_port}/sync?device=check"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real client expects
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.paths.append(self.path)
+        if self.server.fail_next:
+            self.server.fail_next -= 1
+            status = 503
+        else:
+            body = json.loads(gzip.decompress(data))
+            self.server.batches.append(body)
+            self.server.rows.update(tuple(row) for row in body["rows"])
+            status = 200
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args): pass
+
+def check(rows=12000):
+    # Batching, a retried 503, a rotation and a merge must all leave the server
+    # holding exactly the local log; the query string must reach it too
+    server = StandInServer().start()
+    with tempfile.TemporaryDirectory() as d:
+        eng = AppEngine()
+        eng.init_storage(d, "csv")
+        for i in range(rows): eng.save_log("Squat", 100 + i % 50, 5)
+        client = SyncClient(eng, server.url, HttpSession(), backoff=0.01)
+        server.fail_next = 2
+        assert client.sync_once() == rows
+        assert max(len(b["rows"]) for b in server.batches) <= SYNC_BATCH
+        assert all(p == "/sync?device=check" for p in server.paths), server.paths
+        eng.rotate_log(max_rows=rows // 2)
+        eng.save_log("Squat", 200, 5)
+        assert client.sync_once() == 1
+        other = os.path.join(d, 'other.csv')
+        with open(other, 'w') as f: f.write("Date,Exercise,Weight,Reps,1RM\n2020-01-01,Bench Press,60,5,70\n")
+        eng.import_logs([other])
+        client.sync_once()
+        assert server.rows == {tuple(row) for row in eng.store.rows()}
+        client.stop()
+        if eng.rotator: eng.rotator.join()
+    server.shutdown()
+    return len(server.batches)
+
+if __name__ == "__main__":
+    print(f"ok: {check()} batches")
@@ -0,0 +1,1621 @@
+"""Iron Vault engine: math, exercise data and log storage.
+
+Pure Python (NumPy optional) so scripts, benchmarks and sync jobs can import
+it without Kivy or a display. The app UI lives in main.py.
+"""
+import os
+import re
+import sys
+import csv
+import gzip
+import json
+import mmap
+import heapq
+import random
+import struct
+import time
+import tempfile
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict, deque, namedtuple
+from itertools import islice
+from datetime import date, timedelta
+from functools import lru_cache
+from math import gcd
+
+try:
+    import numpy  # optional: vectorized archive analytics
+except ImportError:
+    numpy = None
+
+def is_android():
+    # The check kivy.utils.platform makes, without importing Kivy
+    return 'P4A_BOOTSTRAP' in os.environ or 'ANDROID_ARGUMENT' in os.environ
+
+def monotonic():
+    # Seconds on a clock that never jumps. CLOCK_BOOTTIME keeps counting while the
+    # phone sleeps (plain monotonic stops), so timers survive the screen going off.
+    if hasattr(time, 'CLOCK_BOOTTIME'): return time.clock_gettime(time.CLOCK_BOOTTIME)
+    return time.monotonic()
+
+# =========================================================================
+# 1. MATH & LOGIC
+# =========================================================================
+
+PLATES = [25, 20, 15, 10, 5, 2.5, 1.25]
+BAR_WEIGHT = 20
+MAX_LOAD = 1000  # heaviest bar load the plate tools accept (kg or lb)
+
+# Plate inventories: (plate weight, plates owned) heaviest first; None = unlimited.
+# Plates are loaded in pairs, so a count of 3 allows one per side.
+KG_PLATES = tuple((p, None) for p in PLATES)
+LB_PLATES = ((45, None), (35, None), (25, None), (10, None), (5, None), (2.5, None))
+SOLVER_SCALE = 1000  # solve in integer thousandths (grams for kg) so nothing drifts
+
+PlateLoad = namedtuple("PlateLoad", "side total short")  # side: plates per side, heaviest first
+
+def _units(x):
+    return int(round(float(x) * SOLVER_SCALE))
+
+@lru_cache(maxsize=512)
+def _solve_side(side, inventory):
+    # side and plate sizes are integers already divided by their gcd.
+    # best[i][s] = fewest plates from inventory[i:] summing exactly to s.
+    inf = float("inf")
+    best = [[inf] * (side + 1) for _ in range(len(inventory) + 1)]
+    best[-1][0] = 0
+    for i in range(len(inventory) - 1, -1, -1):
+        q, cap = inventory[i]
+        nxt, row = best[i + 1], best[i]
+        for s in range(side + 1):
+            if cap is None:
+                # Unlimited plate: take one more on top of the best for s - q, so
+                # each row is linear in side rather than quadratic
+                row[s] = min(nxt[s], row[s - q] + 1) if s >= q else nxt[s]
+            else:
+                row[s] = min(k + nxt[s - k * q] for k in range(min(cap, s // q) + 1))
+    reach = next(s for s in range(side, -1, -1) if best[0][s] < inf)
+    # Walk back preferring the most of each heavier plate among minimal solutions
+    counts, s = [], reach
+    for i, (q, cap) in enumerate(inventory):
+        kmax = s // q if cap is None else min(cap, s // q)
+        k = next(k for k in range(kmax, -1, -1) if k + best[i + 1][s - k * q] == best[i][s])
+        counts.append(k)
+        s -= k * q
+    return tuple(counts), reach
+
+def solve_plates(target, bar=BAR_WEIGHT, inventory=KG_PLATES):
+    # Minimal-plate load for target, exact when possible, otherwise the nearest
+    # load below it. Memoized per (inventory, bar, target), so repeat calls are O(1).
+    return _solve_plates(_units(target), _units(bar), tuple(inventory))
+
+@lru_cache(maxsize=1024)
+def _solve_plates(target, bar, inventory):
+    if target <= bar: return PlateLoad((), bar / SOLVER_SCALE, max(target - bar, 0) / SOLVER_SCALE)
+    sizes = [(_units(p), None if n is None else n // 2) for p, n in inventory]
+    g = 0
+    for q, _ in sizes: g = gcd(g, q)
+    side = min((target - bar) // 2 // g, MAX_LOAD * SOLVER_SCALE // g)
+    counts, reach = _solve_side(side, tuple((q // g, n) for q, n in sizes))
+    plates = tuple(p for (p, _), k in zip(inventory, counts) for _ in range(k))
+    total = bar + 2 * reach * g
+    return PlateLoad(plates, total / SOLVER_SCALE, (target - total) / SOLVER_SCALE)
+
+def calculate_plates(weight, bar=BAR_WEIGHT, inventory=KG_PLATES, unit="kg"):
+    try:
+        w = float(weight)
+        if not w <= MAX_LOAD: return "Invalid"
+        if w < bar: return "Bar Only"
+        load = solve_plates(w, bar, inventory)
+    except (TypeError, ValueError): return "Invalid"
+    text = f"Side: {', '.join(str(p) for p in load.side)}" if load.side else "Bar Only"
+    return text + (f" (-{load.short:g}{unit})" if load.short else "")
+
+def calculate_1rm(weight, reps):
+    try:
+        w, r = float(weight), int(reps)
+        return int(w * (1 + r / 30)) if r > 1 else int(w)
+    except: return 0
+
+# --- BATCH VERSIONS ---
+# Same results as the scalar functions, element-wise. NumPy arrays come back
+# when NumPy is installed, array.array otherwise. Bad elements are flagged in the
+# mask (and hold 0) instead of being swallowed.
+
+def _parse_batch(values, cast):
+    out, bad = [], []
+    for v in values:
+        try:
+            out.append(cast(v))
+            bad.append(False)
+        except (TypeError, ValueError, OverflowError):
+            out.append(cast(0))
+            bad.append(True)
+    return out, bad
+
+def _checked_1rm(w, r):
+    # calculate_1rm for the array fallback: None instead of 0 for bad input
+    try:
+        w, r = float(w), int(r)
+        return int(w * (1 + r / 30)) if r > 1 else int(w)
+    except (TypeError, ValueError, OverflowError): return None
+
+def calculate_1rm_batch(weights, reps):
+    # -> (1RMs, invalid mask); valid entries equal calculate_1rm(w, r)
+    if numpy is None:
+        # Clean input takes one comprehension, so the fallback costs no more than
+        # the scalar loop; any bad element reruns it element by element
+        try:
+            out = array('q', [int(w * (1 + r / 30)) if r > 1 else int(w)
+                              for w, r in zip(map(float, weights), map(int, reps))])
+            return out, array('B', bytes(len(out)))
+        except (TypeError, ValueError, OverflowError): pass
+        es = [_checked_1rm(w, r) for w, r in zip(weights, reps)]
+        bad = [i for i, e in enumerate(es) if e is None]
+        for i in bad: es[i] = 0
+        try: out = array('q', es)
+        except OverflowError:
+            bad += [i for i, e in enumerate(es) if not -2 ** 63 <= e < 2 ** 63]
+            for i in bad: es[i] = 0
+            out = array('q', es)
+        mask = array('B', bytes(len(es)))
+        for i in bad: mask[i] = 1
+        return out, mask
+    ws, bad_w = _parse_batch(weights, float)
+    rs, bad_r = _parse_batch(reps, int)
+    w, r = numpy.array(ws, dtype=numpy.float64), numpy.array(rs, dtype=numpy.float64)
+    e = numpy.trunc(numpy.where(r > 1, w * (1 + r / 30), w))
+    bad = numpy.array(bad_w) | numpy.array(bad_r) | ~(numpy.abs(e) < 2.0 ** 63)
+    return numpy.where(bad, 0, e).astype(numpy.int64), bad
+
+def calculate_plates_batch(weights):
+    # -> (counts, invalid mask); counts[i][j] is the number of PLATES[j] per side.
+    # Works in the solver's integer units, where greedy is optimal for the
+    # unlimited KG_PLATES set, so counts match solve_plates(w).side for the
+    # default bar and inventory.
+    # Unparseable weights and anything over MAX_LOAD are invalid, as in
+    # calculate_plates; anything under the bar is all zeros.
+    ws, bad = _parse_batch(weights, float)
+    bar, sizes = _units(BAR_WEIGHT), [_units(p) for p in PLATES]
+    if numpy is not None:
+        w = numpy.array(ws, dtype=numpy.float64)
+        bad = numpy.array(bad, dtype=bool) | ~(w <= MAX_LOAD)
+        ok = ~bad & (w >= BAR_WEIGHT)
+        # rint rounds half to even like round() in _units
+        rem = (numpy.rint(numpy.where(ok, w, BAR_WEIGHT) * SOLVER_SCALE).astype(numpy.int64) - bar) // 2
+        counts = numpy.zeros((len(ws), len(PLATES)), dtype=numpy.int64)
+        for j, q in enumerate(sizes):
+            counts[:, j], rem = numpy.divmod(rem, q)
+        return counts, bad
+    counts, mask, cache, zeros = [], array('B'), {}, array('q', [0] * len(PLATES))
+    for w, b in zip(ws, bad):
+        b = b or not w <= MAX_LOAD
+        if b or w < BAR_WEIGHT: counts.append(zeros)
+        else:
+            rem = (_units(w) - bar) // 2
+            if rem not in cache:
+                row, r = array('q'), rem
+                for q in sizes:
+                    n, r = divmod(r, q)
+                    row.append(n)
+                cache[rem] = row
+            counts.append(cache[rem])
+        mask.append(b)
+    return counts, mask
+
+# =========================================================================
+# 2. THE ETERNAL DATABASE
+# =========================================================================
+
+GUIDE_DATA = {
+    "1. The Iron Philosophy": {"subtitle": "POWER + HYPERTROPHY", "body": "The Hybrid Athlete needs Strength and Size. PHAT combines them.\n\n• Days 1-2: Power (3-5 Reps). Builds density.\n• Days 4-6: Hypertrophy (8-15 Reps). Builds size.\n\nHeavy lifting builds the engine. Volume builds the fuel tank."},
+    "2. The RAMP Warmup": {"subtitle": "DON'T STRETCH COLD", "body": "• R (Raise): Sweat first.\n• A (Activate): Glutes/Core.\n• M (Mobilize): Dynamic moves.\n• P (Potentiate): Warmup sets."},
+    "3. The Big 3": {"subtitle": "TECHNICAL MASTERY", "body": "SQUAT: Tripod foot. Break bar across traps.\nBENCH: Leg drive back. Arch tight.\nDEADLIFT: Pull slack. Push floor away."},
+    "4. Overload": {"subtitle": "DO MORE", "body": "1. Intensity (+2.5kg)\n2. Volume (+1 Rep)\n3. Density (Less Rest)\n4. Technique (Slower)"},
+    "5. Nutrition": {"subtitle": "FUEL", "body": "Surplus = Growth.\nDeficit = Cut.\nProtein = 1g/lb.\nSleep = 8 Hours (The best steroid)."},
+    "6. CNS Fatigue": {"subtitle": "SYSTEM MANAGEMENT", "body": "If grip is weak or motivation is zero, you are fried. Take a deload week (50% volume)."},
+    "7. Equipment": {"subtitle": "TOOLS", "body": "Barbells = Mass.\nDumbbells = Balance.\nCables = Isolation.\nMachines = Failure safely."},
+    "8. Injury": {"subtitle": "STAY SAFE", "body": "Good Pain = Dull ache (DOMS).\nBad Pain = Sharp/Joint.\nFix: Form > Weight."}
+}
+
+EXERCISE_DB = {
+    # --- PHAT SPLIT (FULL BODY COVERAGE GUARANTEED) ---
+    "Upper Power": [
+        {"name": "Bench Press", "reps": "3x5", "cue": "Chest Power", "icon": "arm-flex", "type": "POWER"},
+        {"name": "Bent Over Rows", "reps": "3x5", "cue": "Back Thickness", "icon": "rowing", "type": "POWER"},
+        {"name": "Overhead Press", "reps": "3x6", "cue": "Shoulder Mass", "icon": "human-handsup", "type": "POWER"},
+        {"name": "Weighted Pullups", "reps": "3x6", "cue": "Lat Width", "icon": "human-handsup", "type": "POWER"},
+        {"type": "pool", "options": [
+            {"name": "Barbell Curls", "reps": "3x8", "cue": "Bicep Mass", "icon": "arm-flex", "type": "ACC", "odds": 2},
+            {"name": "Hammer Curl", "reps": "3x8", "cue": "Bicep Mass", "icon": "gavel", "type": "ACC"}]},
+        {"name": "Skullcrushers", "reps": "3x8", "cue": "Tricep Mass", "icon": "arm-flex-outline", "type": "ACC"}
+    ],
+    "Lower Power": [
+        {"name": "Squat", "reps": "3x5", "cue": "Quad Power", "icon": "human-male-height", "type": "POWER"},
+        {"name": "Deadlift", "reps": "3x5", "cue": "Posterior Chain", "icon": "weight-lifter", "type": "POWER"},
+        {"name": "Leg Press", "reps": "3x10", "cue": "Leg Volume", "icon": "car-brake-pedal", "type": "ACC"},
+        {"name": "Leg Curl", "reps": "3x10", "cue": "Hamstrings", "icon": "seat-recline-normal", "type": "ACC"},
+        {"name": "Calf Raise", "reps": "4x15", "cue": "Calves", "icon": "arrow-up-bold", "type": "ACC"}
+    ],
+    "Push Hyper": [
+        {"name": "Inc DB Press", "reps": "3x10", "cue": "Upper Chest", "icon": "dumbbell", "type": "HYPER"},
+        {"name": "Seated Press", "reps": "3x12", "cue": "Shoulders", "icon": "human-handsup", "type": "HYPER"},
+        {"type": "pool", "options": [
+            {"name": "Cable Fly", "reps": "3x15", "cue": "Chest Iso", "icon": "butterfly", "type": "HYPER", "odds": 2},
+            {"name": "Pushups", "reps": "3xFail", "cue": "Chest Iso", "icon": "arrow-down-bold", "type": "HYPER"}]},
+        {"name": "Lat Raise", "reps": "4x15", "cue": "Side Delts", "icon": "bird", "type": "HYPER"},
+        {"name": "Tricep Pushdown", "reps": "3x15", "cue": "Triceps", "icon": "arrow-down-bold", "type": "HYPER"},
+        {"name": "Dips", "reps": "Failure", "cue": "Burnout", "icon": "format-vertical-align-bottom", "type": "FINISHER"}
+    ],
+    "Pull Hyper": [
+        {"name": "Barbell Rows", "reps": "4x10", "cue": "Back Density", "icon": "rowing", "type": "HYPER"},
+        {"name": "Lat Pulldown", "reps": "3x12", "cue": "Back Width", "icon": "tshirt-v", "type": "HYPER"},
+        {"name": "Face Pulls", "reps": "4x15", "cue": "Rear Delts", "icon": "eye-outline", "type": "HYPER"},
+        {"name": "Shrugs", "reps": "3x15", "cue": "Traps", "icon": "tshirt-v", "type": "HYPER"},
+        {"name": "Hammer Curl", "reps": "3x12", "cue": "Forearms", "icon": "gavel", "type": "HYPER"},
+        {"type": "pool", "options": [
+            {"name": "Preacher Curl", "reps": "3x12", "cue": "Bicep Peak", "icon": "arm-flex", "type": "HYPER"},
+            {"name": "Inc Curl", "reps": "3x12", "cue": "Bicep Peak", "icon": "dumbbell", "type": "HYPER"}]}
+    ],
+    "Legs Hyper": [
+        {"name": "Front Squat", "reps": "3x10", "cue": "Quads", "icon": "human-male-height", "type": "HYPER"},
+        {"name": "Lunges", "reps": "3x20", "cue": "Unilateral", "icon": "walk", "type": "HYPER"},
+        {"name": "Leg Ext", "reps": "3x15", "cue": "Quad Iso", "icon": "seat-recline-normal", "type": "HYPER"},
+        {"type": "pool", "options": [
+            {"name": "Goblet Squat", "reps": "3x12", "cue": "Depth", "icon": "dumbbell", "type": "HYPER"},
+            {"name": "Leg Press", "reps": "3x15", "cue": "Depth", "icon": "car-brake-pedal", "type": "HYPER"}]},
+        {"name": "Seated Calf", "reps": "4x20", "cue": "Calves", "icon": "arrow-up-bold", "type": "HYPER"}
+    ],
+    
+    # --- SPECIALTY SPLITS ---
+    "Bicep Blaster": [{"name": "BB Curl", "reps": "4x8", "icon": "arm-flex"}, {"name": "Inc Curl", "reps": "3x10", "icon": "dumbbell"}, {"name": "Hammer", "reps": "3x12", "icon": "gavel"}, {"name": "21s", "reps": "2 Sets", "icon": "flash"}],
+    "Tricep Torture": [{"name": "C.G. Bench", "reps": "4x8", "icon": "arm-flex-outline"}, {"name": "Skullcrush", "reps": "3x10", "icon": "dumbbell"}, {"name": "Pushdown", "reps": "3x15", "icon": "arrow-down-bold"}, {"name": "Dips", "reps": "Fail", "icon": "format-vertical-align-bottom"}],
+    "Chest Focus": [{"name": "Bench", "reps": "4x8", "icon": "arm-flex"}, {"name": "Inc DB", "reps": "3x10", "icon": "dumbbell"}, {"name": "Dips", "reps": "3xFail", "icon": "format-vertical-align-bottom"}, {"name": "Fly", "reps": "3x15", "icon": "butterfly"}, {"name": "Pushups", "reps": "2xFail", "icon": "arrow-down-bold"}],
+    "Back Focus": [{"name": "Deadlift", "reps": "3x5", "icon": "weight-lifter"}, {"name": "Pullups", "reps": "3xFail", "icon": "human-handsup"}, {"name": "T-Bar", "reps": "3x10", "icon": "rowing"}, {"name": "Pulldown", "reps": "3x15", "icon": "arrow-down-bold"}],
+    "Shoulder Focus": [{"name": "OHP", "reps": "4x8", "icon": "human-handsup"}, {"name": "Arnold", "reps": "3x12", "icon": "dumbbell"}, {"name": "Lat Raise", "reps": "5x15", "icon": "bird"}, {"name": "Face Pull", "reps": "3x15", "icon": "eye-outline"}],
+    "Leg Focus": [{"name": "Squat", "reps": "4x8", "icon": "human-male-height"}, {"name": "Leg Press", "reps": "3x12", "icon": "car-brake-pedal"}, {"name": "Lunges", "reps": "3x20", "icon": "walk"}, {"name": "Leg Curl", "reps": "3x15", "icon": "seat-recline-normal"}],
+    
+    # --- CONDITIONING & FLOWS ---
+    "HIIT": [{"name": "Burpees", "reps": "45s", "icon": "run-fast"}, {"name": "Box Jumps", "reps": "45s", "icon": "arrow-up-bold"}, {"name": "Climbers", "reps": "45s", "icon": "run"}],
+    "Tabata": [{"name": "Sprints", "reps": "20s/10s", "icon": "run-fast"}, {"name": "Swings", "reps": "20s/10s", "icon": "kettlebell"}],
+    "EMOM": [{"name": "Thrusters", "reps": "10/min", "icon": "dumbbell"}, {"name": "Pullups", "reps": "5/min", "icon": "human-handsup"}],
+    "Animal Flow": [
+        {"name": "Beast Crawl", "reps": "60s", "cue": "Knees Hovering", "icon": "dog-side"},
+        {"name": "Crab Walk", "reps": "60s", "cue": "Hips High", "icon": "human-handsdown"},
+        {"name": "Scorpion Reach", "reps": "10/side", "cue": "Rotate Hips", "icon": "yoga"},
+        {"name": "Ape Hops", "reps": "60s", "cue": "Lateral", "icon": "run"}
+    ],
+    
+    # --- RECOVERY ---
+    "Desk Undo": [{"name": "Chin Tucks", "reps": "20 reps", "icon": "head"}, {"name": "Doorway Stretch", "reps": "60s", "icon": "door"}, {"name": "Thoracic Ext", "reps": "60s", "icon": "yoga"}],
+    "Squat Primer": [{"name": "90/90", "reps": "60s", "icon": "seat-recline-normal"}, {"name": "Ankle Rocks", "reps": "20 reps", "icon": "foot-print"}, {"name": "Goblet Hold", "reps": "60s", "icon": "dumbbell"}],
+    "Mobility": [{"name": "Cat Cow", "reps": "60s", "icon": "yoga"}, {"name": "90/90", "reps": "60s", "icon": "seat-recline-normal"}, {"name": "Deep Squat", "reps": "60s", "icon": "human-male-height"}]
+}
+
+# Home screen catalog: (mode, card label, icon, section), in display order.
+# Layout and colours live with the UI (main.HOME_LAYOUT).
+ModeCard = namedtuple("ModeCard", "mode label icon section")
+MODE_CATALOG = [ModeCard(*m) for m in (
+    ("Upper Power", "UPPER POWER", "arm-flex", "PHAT SYSTEM"),
+    ("Lower Power", "LOWER POWER", "weight-lifter", "PHAT SYSTEM"),
+    ("Push Hyper", "PUSH", "arrow-up-bold-box-outline", "PHAT SYSTEM"),
+    ("Pull Hyper", "PULL", "arrow-down-bold-box-outline", "PHAT SYSTEM"),
+    ("Legs Hyper", "LEGS", "run", "PHAT SYSTEM"),
+    ("Bicep Blaster", "BICEPS", "arm-flex", "SPECIALTY"),
+    ("Tricep Torture", "TRICEPS", "arm-flex-outline", "SPECIALTY"),
+    ("Chest Focus", "CHEST", "dumbbell", "SPECIALTY"),
+    ("Back Focus", "BACK", "weight-lifter", "SPECIALTY"),
+    ("Shoulder Focus", "SHOULDERS", "human-handsup", "SPECIALTY"),
+    ("Leg Focus", "LEGS", "human-male-height", "SPECIALTY"),
+    ("HIIT", "HIIT", "run-fast", "CONDITIONING"),
+    ("Animal Flow", "ANIMAL FLOW", "dog-side", "CONDITIONING"),
+    ("Tabata", "TABATA", "timer-sand", "CONDITIONING"),
+    ("EMOM", "EMOM", "timer-outline", "CONDITIONING"),
+    ("Desk Undo", "DESK UNDO", "chair-rolling", "RECOVERY"),
+    ("Squat Primer", "PRIMER", "human-male-height", "RECOVERY"),
+    ("Mobility", "FLOW", "yoga", "RECOVERY"),
+)]
+
+WARMUPS = [
+    {"name": "Arm Circles", "reps": "30s", "cue": "Dynamic", "icon": "refresh", "type": "WARMUP"},
+    {"name": "Band Pulls", "reps": "20 Reps", "cue": "Rear Delts", "icon": "arrow-left-right", "type": "WARMUP"}
+]
+
+COOLDOWNS = {
+    "General": {"name": "Childs Pose", "reps": "60s", "cue": "Relax Spine", "icon": "human-child", "type": "COOLDOWN"}
+}
+
+# --- EXERCISE CATALOG ---
+# Every exercise name in the DB maps to one canonical name; the short forms
+# below are aliases, so "OHP" and "Overhead Press" share history and stats.
+# Lookups normalize case and punctuation and are a dict hit; search() walks
+# a word-prefix trie and falls back to trigram similarity for typos.
+# Only true duplicates are aliased: bodyweight "Pullups" stays its own lift so
+# it doesn't feed the weighted version's e1RM and overload targets.
+
+ALIASES = {
+    "Skullcrush": "Skullcrushers", "Hammer": "Hammer Curl", "Bench": "Bench Press", "OHP": "Overhead Press", "Inc DB": "Inc DB Press",
+    "Pulldown": "Lat Pulldown", "Pushdown": "Tricep Pushdown", "Face Pull": "Face Pulls",
+    "BB Curl": "Barbell Curls", "Fly": "Cable Fly",
+}
+FUZZY_MIN = 0.3  # minimum trigram similarity for a fuzzy match
+
+def normalize_name(name):
+    return " ".join(re.sub(r"[^a-z0-9/]+", " ", str(name).lower()).split())
+
+def _trigrams(key):
+    key = f"  {key} "
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+class ExerciseCatalog:
+    def __init__(self, names, aliases=None):
+        aliases = aliases or {}
+        self.names = sorted(set(names) - set(aliases) | set(aliases.values()))
+        spelled = {normalize_name(n): n for n in self.names}
+        for alias, name in aliases.items():
+            if name not in self.names: raise ValueError(f"alias {alias!r} -> unknown {name!r}")
+            spelled[normalize_name(alias)] = name
+        # Exact lookups also ignore spacing: "skull-crush" == "Skullcrush"
+        self.canon = {key.replace(" ", ""): name for key, name in spelled.items()}
+        self.variants = {n: set() for n in self.names}  # canonical -> every spelling seen
+        for n in names: self.variants[self.resolve(n)].add(n)
+        for alias, name in aliases.items(): self.variants[name].add(alias)
+        self.trie, self.grams, self.keys = {}, {}, {}
+        for key, name in spelled.items():
+            self.keys.setdefault(name, []).append(_trigrams(key))
+            words = key.split()
+            # Index every word start so "curl" finds "Hammer Curl"
+            for i in range(len(words)):
+                node = self.trie
+                for ch in " ".join(words[i:]):
+                    node = node.setdefault(ch, {})
+                    node.setdefault("", set()).add(name)
+            for g in self.keys[name][-1]: self.grams.setdefault(g, set()).add(name)
+
+    def resolve(self, name):
+        # Canonical name, or the name itself for exercises the catalog doesn't know
+        return self.canon.get(normalize_name(name).replace(" ", ""), name)
+
+    def spellings(self, name):
+        name = self.resolve(name)
+        return frozenset(self.variants.get(name, ()) | {name})
+
+    def prefix(self, query):
+        node = self.trie
+        for ch in normalize_name(query):
+            node = node.get(ch)
+            if node is None: return []
+        return sorted(node.get("", ()))
+
+    def fuzzy(self, query, limit=10):
+        grams = _trigrams(normalize_name(query))
+        hits = set()
+        for g in grams: hits.update(self.grams.get(g, ()))
+        scored = []
+        for name in hits:
+            # Best score over the name and its aliases
+            score = max(len(grams & k) / len(grams | k) for k in self.keys[name])
+            if score >= FUZZY_MIN: scored.append((-score, name))
+        return [name for _, name in sorted(scored)[:limit]]
+
+    def search(self, query, limit=10):
+        # Prefix matches first, then fuzzy ones not already listed
+        found = self.prefix(query)[:limit]
+        if len(found) < limit:
+            found += [n for n in self.fuzzy(query, limit) if n not in found][:limit - len(found)]
+        return found
+
+def _db_names():
+    for slots in EXERCISE_DB.values():
+        for s in slots:
+            for o in (s["options"] if s.get("type") == "pool" else [s]): yield o["name"]
+    for w in WARMUPS: yield w["name"]
+    for c in COOLDOWNS.values(): yield c["name"]
+
+CATALOG = ExerciseCatalog(list(_db_names()), ALIASES)
+
+# --- COMPILED PLANS ---
+# EXERCISE_DB is compiled once at import into immutable per-mode templates.
+# Slot.type is the phase shown in the app bar (WARMUP/WORKOUT/COOLDOWN);
+# Slot.kind keeps the DB "type" (POWER, HYPER, ACC, FINISHER or "").
+
+FLOW_MODES = frozenset(["Mobility", "HIIT", "Tabata", "EMOM", "Desk Undo", "Squat Primer", "Animal Flow"])
+
+# Rest after a set, by Slot.kind (or Slot.type for warmup/cooldown)
+REST_SECONDS = {"POWER": 180, "HYPER": 90, "ACC": 90, "FINISHER": 60, "WARMUP": 30, "COOLDOWN": 0}
+DEFAULT_REST = 90
+
+def rest_seconds(slot):
+    return REST_SECONDS.get(slot.kind or slot.type, DEFAULT_REST)
+
+# Free-text "reps" strings compiled once into typed prescriptions. Fields that
+# don't apply are 0/False: "3x5" -> sets 3 reps 5; "20s/10s" -> work 20 rest 10;
+# "10/min" -> reps 10 every 60; "45s" -> seconds 45; "3xFail" -> sets 3 to_failure.
+class Prescription(namedtuple("Prescription", "sets reps seconds work rest every per_side to_failure")):
+    __slots__ = ()
+
+    def planned_volume(self, weight):
+        # kg x reps the prescription asks for (both sides for per-side work)
+        return self.sets * self.reps * weight * (2 if self.per_side else 1)
+
+RX_PATTERNS = [
+    (re.compile(r"(\d+)\s*x\s*(\d+)"), lambda m: dict(sets=int(m[1]), reps=int(m[2]))),
+    (re.compile(r"(\d+)\s*x\s*fail(?:ure)?"), lambda m: dict(sets=int(m[1]), to_failure=True)),
+    (re.compile(r"fail(?:ure)?"), lambda m: dict(sets=1, to_failure=True)),
+    (re.compile(r"(\d+)\s*sets?"), lambda m: dict(sets=int(m[1]))),
+    (re.compile(r"(\d+)\s*reps?"), lambda m: dict(sets=1, reps=int(m[1]))),
+    (re.compile(r"(\d+)s\s*/\s*(\d+)s"), lambda m: dict(work=int(m[1]), rest=int(m[2]))),
+    (re.compile(r"(\d+)s"), lambda m: dict(sets=1, seconds=int(m[1]))),
+    (re.compile(r"(\d+)\s*/\s*min"), lambda m: dict(reps=int(m[1]), every=60)),
+    (re.compile(r"(\d+)\s*/\s*side"), lambda m: dict(sets=1, reps=int(m[1]), per_side=True)),
+]
+
+def parse_prescription(text):
+    spec = text.strip().lower()
+    for pattern, build in RX_PATTERNS:
+        m = pattern.fullmatch(spec)
+        if m:
+            fields = dict(sets=0, reps=0, seconds=0, work=0, rest=0, every=0, per_side=False, to_failure=False)
+            fields.update(build(m))
+            return Prescription(**fields)
+    raise ValueError(f"unrecognised prescription {text!r}")
+
+Slot = namedtuple("Slot", "name reps cue icon type kind history suggest rx")
+Pool = namedtuple("Pool", "options odds")  # a slot filled by one of several Slots at generate time
+Plan = namedtuple("Plan", "warmup main cooldown")
+
+def compile_slot(entry, phase, history="-"):
+    kind = entry.get("type", "")
+    try: rx = parse_prescription(entry["reps"])
+    except ValueError as e: raise ValueError(f"{entry['name']}: {e}") from None
+    return Slot(CATALOG.resolve(entry["name"]), entry["reps"], entry.get("cue", ""), entry.get("icon", "dumbbell"),
+                phase, "" if kind == phase else kind, history, None, rx)
+
+def compile_pool(entry):
+    odds = tuple(float(o.get("odds", 1)) for o in entry["options"])
+    if not odds or min(odds) <= 0: raise ValueError("pool needs options with odds > 0")
+    return Pool(tuple(compile_slot(o, "WORKOUT") for o in entry["options"]), odds)
+
+def compile_plans(db):
+    warmup = tuple(compile_slot(w, "WARMUP") for w in WARMUPS)
+    cooldown = (compile_slot(COOLDOWNS["General"], "COOLDOWN"),)
+    plans = {}
+    for mode, slots in db.items():
+        # Bad entries fail the import with the mode in the message, not mid-workout
+        try:
+            main = tuple(compile_pool(s) if s.get("type") == "pool" else compile_slot(s, "WORKOUT") for s in slots)
+        except ValueError as e: raise ValueError(f"EXERCISE_DB[{mode!r}]: {e}") from None
+        plans[mode] = Plan((), main, ()) if mode in FLOW_MODES else Plan(warmup, main, cooldown)
+    plans[None] = Plan(warmup, (), cooldown)  # unknown modes still get warmup + cooldown
+    return plans
+
+def check_catalog(catalog, db):
+    # Every home card must open a mode that exists; fails the import otherwise
+    for card in catalog:
+        if card.mode not in db: raise ValueError(f"MODE_CATALOG: {card.mode!r} is not in EXERCISE_DB")
+
+PLANS = compile_plans(EXERCISE_DB)
+check_catalog(MODE_CATALOG, EXERCISE_DB)
+
+# --- INTERVAL TIMELINES ---
+# Conditioning modes run on a precomputed timeline instead of LOG SET & REST.
+# Tabata: TABATA_ROUNDS of work/rest per exercise. HIIT: HIIT_ROUNDS circuits of
+# timed work with HIIT_REST between moves. EMOM: EMOM_MINUTES one-minute blocks
+# rotating through the exercises.
+INTERVAL_MODES = frozenset(["HIIT", "Tabata", "EMOM"])
+TABATA_ROUNDS = 8
+HIIT_ROUNDS = 3
+HIIT_REST = 15
+EMOM_MINUTES = 10
+
+Phase = namedtuple("Phase", "start end idx label")  # seconds from start; idx into the playlist
+Timeline = namedtuple("Timeline", "phases starts")    # starts: phase start times, for bisect
+
+def build_timeline(playlist, mode):
+    phases, t = [], 0
+    def add(secs, idx, label):
+        nonlocal t
+        if secs > 0:
+            phases.append(Phase(t, t + secs, idx, label))
+            t += secs
+    if mode == "Tabata":
+        for i, slot in enumerate(playlist):
+            for r in range(TABATA_ROUNDS):
+                add(slot.rx.work, i, f"WORK {r + 1}/{TABATA_ROUNDS}")
+                add(slot.rx.rest, i, "REST")
+    elif mode == "HIIT":
+        for r in range(HIIT_ROUNDS):
+            for i, slot in enumerate(playlist):
+                add(slot.rx.seconds, i, f"ROUND {r + 1}/{HIIT_ROUNDS}")
+                add(HIIT_REST, i, "REST")
+    elif mode == "EMOM":
+        for m in range(EMOM_MINUTES):
+            i = m % len(playlist)
+            add(playlist[i].rx.every or 60, i, f"MIN {m + 1}/{EMOM_MINUTES}")
+    if phases and phases[-1].label == "REST": phases.pop()  # no rest after the last effort
+    return Timeline(tuple(phases), tuple(p.start for p in phases))
+
+def phase_index(timeline, t):
+    # Index of the phase running t seconds in, or None once the timeline is over
+    i = bisect_right(timeline.starts, t) - 1
+    return i if 0 <= i < len(timeline.phases) and t < timeline.phases[i].end else None
+
+# =========================================================================
+# 3. ENGINE (SAFE STORAGE)
+# =========================================================================
+
+TAIL_BLOCK = 4096      # bytes read per backwards seek
+TAIL_MAX_LINE = 65536  # a longer "row" means a corrupt log; stop instead of buffering it
+FLUSH_DELAY = 5.0      # seconds a logged set may sit in memory before hitting disk
+FSYNC_ON_FLUSH = True  # a killed app loses at most the last FLUSH_DELAY seconds
+MIGRATE_BATCH = 1000   # CSV rows per SQLite transaction during migration
+STORAGE_WAIT = 5.0     # seconds generate waits for a background init_storage
+ROTATE_ROWS = 20000    # live CSV rows that trigger a row-count rotation
+ROTATE_KEEP = 5000     # newest rows left in the live file after one
+LOG_HEADER = ["Date", "Exercise", "Weight", "Reps", "1RM"]
+
+def parse_line(line):
+    # One raw CSV line (bytes) -> row list, or None for blanks/garbage
+    line = line.strip()
+    if not line: return None
+    row = next(csv.reader([line.decode('utf-8', 'replace')]), None)
+    return row if row and len(row) >= 4 else None
+
+class CsvStore:
+    # Append-only iron_log.csv plus rotated segments. Every backend exposes the
+    # same methods: open, append, rows, latest, recent, watermark, changes, close.
+    #
+    # rotate() moves old rows into segments/ (gzip optional) and records each
+    # segment in iron_manifest.json with its date range, row count and the last
+    # (weight, reps) per exercise, so hot-path lookups never open a segment.
+    filename = 'iron_log.csv'
+
+    def __init__(self, path):
+        self.path = path
+        self.dir = os.path.dirname(path)
+        self.manifest_path = os.path.join(self.dir, 'iron_manifest.json')
+        self.segments = []  # manifest entries, oldest first
+        self.live_count = 0  # data rows in the live file, kept by latest(), append() and rotate()
+        self.generation = 0  # bumped by absorb(): rows() was rewritten in a new order
+
+    def open(self):
+        if not os.path.exists(self.path):
+            with open(self.path, 'w', newline='') as f:
+                csv.writer(f).writerow(LOG_HEADER)
+        try:
+            with open(self.manifest_path) as f: manifest = json.load(f)
+            self.segments, self.generation = manifest["segments"], manifest.get("generation", 0)
+        except (OSError, ValueError, KeyError): self.segments = []
+
+    def append(self, rows):
+        with open(self.path, 'a', newline='') as f:
+            csv.writer(f).writerows(rows)
+            if FSYNC_ON_FLUSH:
+                f.flush()
+                os.fsync(f.fileno())
+        self.live_count += len(rows)
+
+    def live_rows(self):
+        # Data rows of the live file only, oldest first, streamed
+        with open(self.path, 'r', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                if len(row) >= 4: yield row
+
+    def segment_rows(self, seg):
+        path = os.path.join(self.dir, 'segments', seg["file"])
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                if len(row) >= 4: yield row
+
+    def rows(self):
+        # Full history, oldest first; segments are opened one at a time as reached
+        for seg in self.segments: yield from self.segment_rows(seg)
+        yield from self.live_rows()
+
+    def latest(self):
+        # (exercise, weight, reps) in log order; the caller keeps the last per exercise.
+        # Segments contribute their manifest summary, only the live file is scanned.
+        for seg in self.segments:
+            for ex, (w, r) in seg["exercises"].items(): yield ex, w, r
+        n = 0
+        for n, row in enumerate(self.live_rows(), 1): yield row[1], row[2], row[3]
+        self.live_count = n
+
+    def read_reversed(self):
+        # Yields data rows newest-first. Reads TAIL_BLOCK bytes at a time from EOF,
+        # so memory is bounded by one block plus one partial line.
+        try:
+            with open(self.path, 'rb') as f:
+                pos = f.seek(0, os.SEEK_END)
+                tail = b""
+                while pos > 0:
+                    step = min(TAIL_BLOCK, pos)
+                    pos -= step
+                    f.seek(pos)
+                    lines = (f.read(step) + tail).split(b"\n")
+                    tail = lines.pop(0)
+                    if len(tail) > TAIL_MAX_LINE: return
+                    for line in reversed(lines):
+                        row = parse_line(line)
+                        if row: yield row
+                row = parse_line(tail)
+                if row and row[0] != "Date": yield row
+        except OSError: return
+
+    def recent(self, names, n):
+        # names: every spelling of the exercise (see ExerciseCatalog.spellings)
+        found = []
+        if n <= 0: return found
+        for row in self.read_reversed():
+            if row[1] in names:
+                found.append(row)
+                if len(found) >= n: return found
+        # Older sets: only segments the manifest says contain the exercise, newest first
+        for seg in reversed(self.segments):
+            if not any(ex in names for ex in seg["exercises"]): continue
+            tail = deque((row for row in self.segment_rows(seg) if row[1] in names), maxlen=n - len(found))
+            found.extend(reversed(tail))
+            if len(found) >= n: break
+        return found
+
+    def rotate(self, max_rows=None, by_year=False, compress=True):
+        # Moves old live rows into segments: with by_year, every row from a past
+        # year (one segment per year); otherwise, once the live file exceeds
+        # max_rows, all but its newest ROTATE_KEEP rows. The segment files and
+        # manifest are written before the live file is swapped, so a crash can
+        # at worst leave rows in both places, never lose them.
+        max_rows = max_rows or ROTATE_ROWS
+        total = self.live_count = sum(1 for _ in self.live_rows())
+        this_year = str(date.today().year)
+        if by_year:
+            def bucket(i, row): return row[0][:4] if row[0][:4] < this_year else None
+        elif total > max_rows:
+            cut = total - ROTATE_KEEP
+            def bucket(i, row): return f"seg{len(self.segments) + 1:04d}" if i < cut else None
+        else:
+            return []
+        os.makedirs(os.path.join(self.dir, 'segments'), exist_ok=True)
+        ext = '.csv.gz' if compress else '.csv'
+        tmp_live = self.path + '.tmp'
+        writers, new, kept = {}, [], 0
+        try:
+            with open(tmp_live, 'w', newline='') as live:
+                keep = csv.writer(live)
+                keep.writerow(LOG_HEADER)
+                for i, row in enumerate(self.live_rows()):
+                    tag = bucket(i, row)
+                    if tag is None:
+                        keep.writerow(row)
+                        kept += 1
+                        continue
+                    if tag not in writers:
+                        name = f"iron_log.{tag}{ext}"
+                        if any(s["file"] == name for s in self.segments):
+                            name = f"iron_log.{tag}.{len(self.segments) + len(new) + 1:04d}{ext}"
+                        f = (gzip.open if compress else open)(os.path.join(self.dir, 'segments', name), 'wt', newline='')
+                        csv.writer(f).writerow(LOG_HEADER)
+                        seg = {"file": name, "first": row[0], "last": row[0], "rows": 0, "exercises": {}}
+                        writers[tag] = (f, csv.writer(f), seg)
+                        new.append(seg)
+                    f, out, seg = writers[tag]
+                    out.writerow(row)
+                    seg["last"], seg["rows"] = row[0], seg["rows"] + 1
+                    seg["exercises"][row[1]] = [row[2], row[3]]
+                live.flush()
+                os.fsync(live.fileno())
+        finally:
+            for f, _, _ in writers.values(): f.close()
+        if not new:
+            os.remove(tmp_live)
+            return []
+        self.write_manifest(self.segments + new)
+        os.replace(tmp_live, self.path)
+        self.live_count = kept
+        return new
+
+    def write_manifest(self, segments):
+        with open(self.manifest_path + '.tmp', 'w') as f:
+            json.dump({"segments": segments, "generation": self.generation}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.manifest_path + '.tmp', self.manifest_path)
+        self.segments = segments
+
+    def absorb(self, path):
+        # Swaps in path, a log already holding the full history (e.g. import_logs).
+        # The manifest is emptied first: a crash before the swap leaves the old
+        # segment files on disk but unreferenced (their rows are out of rows()
+        # until re-imported), never counted twice.
+        old, self.segments = self.segments, []
+        self.generation += 1
+        self.write_manifest([])
+        os.replace(path, self.path)
+        self.live_count = sum(1 for _ in self.live_rows())
+        for seg in old:
+            try: os.remove(os.path.join(self.dir, 'segments', seg["file"]))
+            except OSError: pass
+
+    def watermark(self):
+        # Changes whenever rows are added or rotated; the stats snapshot records it
+        return [os.path.getsize(self.path), len(self.segments)]
+
+    def changes(self, cursor=None, limit=None):
+        # Up to limit rows added since cursor (from an earlier call), oldest first,
+        # and the cursor after them. Normally that is a seek to a byte offset in the
+        # live file. After
+        # a rotation the fingerprint of the bytes before the offset no longer
+        # matches; rotation preserves the order of rows(), so the synced row count
+        # is skipped over it. A merge (absorb) re-sorts rows(), so a cursor from an
+        # older generation starts over from the first row: the receiver dedupes.
+        segs = sum(seg["rows"] for seg in self.segments)
+        same = bool(cursor) and cursor.get("gen", 0) == self.generation
+        found = []
+        with open(self.path, 'rb') as f:
+            if same and cursor["segs"] == segs and cursor["offset"] is not None \
+                    and self.fingerprint(f, cursor["offset"]) == cursor["tail"]:
+                done, skip = cursor["rows"], 0
+                offset = f.seek(cursor["offset"])
+            else:
+                # Whole segments are skipped by their manifest row count; only the
+                # one holding the cursor is read
+                skip, done = (cursor["rows"] if same else 0), 0
+                for seg in self.segments:
+                    if skip >= seg["rows"]:
+                        skip, done = skip - seg["rows"], done + seg["rows"]
+                        continue
+                    done, rows = done + skip, self.segment_rows(seg)
+                    found.extend(islice(rows, skip, None if limit is None else skip + limit - len(found)))
+                    skip = 0
+                    if limit is not None and len(found) >= limit:
+                        # Stopped inside the segments: no live offset yet, the next
+                        # call skips by count again
+                        rows.close()
+                        return found, {"rows": done + len(found), "segs": segs, "gen": self.generation, "offset": None, "tail": ""}
+                offset = f.seek(0)
+            while limit is None or len(found) < limit:
+                line = f.readline()
+                if not line.endswith(b"\n"): break  # a partial last line waits for the next call
+                offset += len(line)
+                row = parse_line(line)
+                if not row or row[0] == "Date": continue
+                if skip: skip, done = skip - 1, done + 1
+                else: found.append(row)
+            tail = self.fingerprint(f, offset)
+        return found, {"rows": done + len(found), "segs": segs, "gen": self.generation, "offset": offset, "tail": tail}
+
+    @staticmethod
+    def fingerprint(f, offset):
+        f.seek(max(0, offset - 32))
+        return f.read(min(offset, 32)).hex()
+
+    def close(self): pass
+
+class SqliteStore:
+    # iron_log.db: indexed on (exercise, date), WAL journal, one transaction per flush.
+    filename = 'iron_log.db'
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def open(self):
+        import sqlite3
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS sets (id INTEGER PRIMARY KEY, date TEXT, exercise TEXT, weight TEXT, reps TEXT, one_rm INTEGER)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS sets_ex_date ON sets (exercise, date)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        csv_path = os.path.join(os.path.dirname(self.path), CsvStore.filename)
+        if os.path.exists(csv_path):
+            legacy = CsvStore(csv_path)
+            legacy.open()
+            for seg in legacy.segments: self.migrate_segment(legacy, seg)
+            self.migrate_csv(csv_path)
+
+    def migrate_segment(self, legacy, seg):
+        # Rotated segments are immutable, so each goes over in one transaction
+        key = 'segment:' + seg["file"]
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone(): return
+        rows = [row[:4] + [row[4] if len(row) > 4 else 0] for row in legacy.segment_rows(seg)]
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT INTO sets (date, exercise, weight, reps, one_rm) VALUES (?, ?, ?, ?, ?)", rows)
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, 'done')", (key,))
+
+    def append(self, rows):
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT INTO sets (date, exercise, weight, reps, one_rm) VALUES (?, ?, ?, ?, ?)",
+                                  [[str(c) for c in row[:4]] + [row[4] if len(row) > 4 else 0] for row in rows])
+
+    def rows(self, page=1000):
+        # Keyset-paged so the connection lock is never held across a yield
+        last = 0
+        while True:
+            with self.lock:
+                batch = self.conn.execute("SELECT id, date, exercise, weight, reps, one_rm FROM sets WHERE id > ? ORDER BY id LIMIT ?", (last, page)).fetchall()
+            if not batch: return
+            for row in batch: yield [str(c) for c in row[1:]]
+            last = batch[-1][0]
+
+    def latest(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT exercise, weight, reps FROM sets WHERE id IN (SELECT MAX(id) FROM sets GROUP BY exercise) ORDER BY id").fetchall()
+        return iter(rows)
+
+    def recent(self, names, n):
+        # One index walk of at most n rows per spelling (sets_ex_date ends in the
+        # rowid, so the ORDER BY needs no sort), then the newest n overall
+        if n <= 0: return []
+        found = []
+        with self.lock:
+            for ex in names:
+                found += self.conn.execute("SELECT date, id, exercise, weight, reps, one_rm FROM sets WHERE exercise = ? ORDER BY date DESC, id DESC LIMIT ?", (ex, n)).fetchall()
+        found.sort(reverse=True)
+        return [[str(row[0])] + [str(c) for c in row[2:]] for row in found[:n]]
+
+    def migrate_csv(self, csv_path):
+        # Streams the legacy CSV in MIGRATE_BATCH-row transactions. The byte offset
+        # reached is committed with each batch, so an interrupted migration resumes
+        # where it stopped and a finished one is a no-op.
+        key = 'csv_offset:' + os.path.abspath(csv_path)
+        with self.lock:
+            done = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        offset = int(done[0]) if done else 0
+        with open(csv_path, 'rb') as f:
+            if offset > os.fstat(f.fileno()).st_size: return
+            f.seek(offset)
+            batch = []
+            while True:
+                line = f.readline()
+                if line.endswith(b"\n"):
+                    row = parse_line(line)
+                    if row and row[0] != "Date": batch.append(row)
+                if len(batch) >= MIGRATE_BATCH or not line.endswith(b"\n"):
+                    pos = f.tell() if line.endswith(b"\n") else f.tell() - len(line)
+                    with self.lock, self.conn:
+                        self.conn.executemany("INSERT INTO sets (date, exercise, weight, reps, one_rm) VALUES (?, ?, ?, ?, ?)",
+                                              [row[:4] + [row[4] if len(row) > 4 else 0] for row in batch])
+                        self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, str(pos)))
+                    batch = []
+                    if not line.endswith(b"\n"): return
+
+    def replace(self, rows):
+        # Swaps the whole table for rows in one transaction and bumps the generation
+        # (see changes)
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('generation', ?)", (self.generation() + 1,))
+            self.conn.execute("DELETE FROM sets")
+            self.conn.executemany("INSERT INTO sets (date, exercise, weight, reps, one_rm) VALUES (?, ?, ?, ?, ?)",
+                                  (row[:4] + [row[4] if len(row) > 4 else 0] for row in rows))
+
+    def watermark(self):
+        with self.lock:
+            return self.conn.execute("SELECT MAX(id) FROM sets").fetchone()[0] or 0
+
+    def generation(self):
+        # Callers hold self.lock
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return int(row[0]) if row else 0
+
+    def changes(self, cursor=None, limit=None):
+        # Same contract as CsvStore.changes. The cursor is the last id sent plus the
+        # row count; a replace() (merge) re-sorts and renumbers the table, so a
+        # cursor from an older generation starts over from the first row.
+        cols = "SELECT id, date, exercise, weight, reps, one_rm FROM sets"
+        with self.lock:
+            gen = self.generation()
+            done, last = (cursor["rows"], cursor["id"]) if cursor and cursor.get("gen", 0) == gen else (0, 0)
+            if self.conn.execute("SELECT COUNT(*) FROM sets WHERE id <= ?", (last,)).fetchone()[0] == done:
+                rows = self.conn.execute(f"{cols} WHERE id > ? ORDER BY id LIMIT ?", (last, limit or -1)).fetchall()
+            else:
+                done = min(done, self.conn.execute("SELECT COUNT(*) FROM sets").fetchone()[0])
+                rows = self.conn.execute(f"{cols} ORDER BY id LIMIT ? OFFSET ?", (limit or -1, done)).fetchall()
+                last = self.conn.execute("SELECT MAX(id) FROM sets").fetchone()[0] or 0
+        if rows: last = rows[-1][0]
+        return [[str(c) for c in row[1:]] for row in rows], {"rows": done + len(rows), "id": last, "gen": gen}
+
+    def close(self):
+        if self.conn:
+            with self.lock: self.conn.close()
+            self.conn = None
+
+BACKENDS = {"csv": CsvStore, "sqlite": SqliteStore}
+STORAGE_BACKEND = "csv"  # default; iron_settings.json "backend" overrides it (AppEngine.set_backend)
+
+# --- COLUMNAR ARCHIVE ---
+# iron_archive.bin, native byte order, every column 4-byte aligned:
+#   header  b"IVA1" | uint32 rows | uint32 names | uint8 little-endian flag | 3 pad bytes
+#   names   per exercise: uint16 byte length + utf-8, then padded to 4 bytes
+#   columns int32 day (date.toordinal) | float32 weight | float32 1RM | uint16 exercise id | uint16 reps
+ARCHIVE_MAGIC = b"IVA1"
+ARCHIVE_COLUMNS = (("day", "i", 4), ("weight", "f", 4), ("one_rm", "f", 4), ("exercise", "H", 2), ("reps", "H", 2))
+
+def write_archive(rows, path):
+    # Streams rows into typed arrays (a few bytes per set, no row lists), then
+    # writes the file atomically. Unparseable weights become NaN, reps 0.
+    cols = {name: array(code) for name, code, _ in ARCHIVE_COLUMNS}
+    ids = {}
+    for row in rows:
+        try: day = date.fromisoformat(row[0]).toordinal()
+        except ValueError: continue
+        try: w = float(row[2])
+        except ValueError: w = float("nan")
+        try: r = min(max(int(row[3]), 0), 65535)
+        except ValueError: r = 0
+        try: rm = float(row[4])
+        except (ValueError, IndexError): rm = float("nan")
+        cols["day"].append(day)
+        cols["weight"].append(w)
+        cols["one_rm"].append(rm)
+        cols["exercise"].append(ids.setdefault(row[1], len(ids)))
+        cols["reps"].append(r)
+    names = b"".join(struct.pack("=H", len(n.encode())) + n.encode() for n in ids)
+    names += b"\0" * (-len(names) % 4)
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(ARCHIVE_MAGIC + struct.pack("=IIB3x", len(cols["day"]), len(ids), sys.byteorder == "little"))
+        f.write(names)
+        for name, _, _ in ARCHIVE_COLUMNS: cols[name].tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return len(cols["day"])
+
+class HistoryArchive:
+    # Memory-mapped view of iron_archive.bin. Columns are zero-copy NumPy arrays
+    # when NumPy is installed, memoryviews otherwise.
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:4] != ARCHIVE_MAGIC: raise ValueError("not an Iron Vault archive")
+        n, k, little = struct.unpack_from("=IIB", self.mm, 4)
+        if bool(little) != (sys.byteorder == "little"): raise ValueError("archive byte order mismatch")
+        off, self.names = 16, []
+        for _ in range(k):
+            size, = struct.unpack_from("=H", self.mm, off)
+            self.names.append(self.mm[off + 2:off + 2 + size].decode())
+            off += 2 + size
+        off += -off % 4
+        self.rows = n
+        for name, code, width in ARCHIVE_COLUMNS:
+            if numpy is not None:
+                col = numpy.frombuffer(self.mm, dtype=code, count=n, offset=off)
+            else:
+                col = memoryview(self.mm)[off:off + n * width].cast(code)
+            setattr(self, name, col)
+            off += n * width
+
+    def max_1rm(self):
+        # Per-exercise best estimated 1RM, using the calculate_1rm formula on the
+        # weight/reps columns
+        if numpy is not None:
+            w, r = self.weight.astype(numpy.float64), self.reps.astype(numpy.float64)
+            e1rm = numpy.trunc(numpy.where(r > 1, w * (1 + r / 30), w))
+            best = numpy.full(len(self.names), -numpy.inf)
+            ok = ~numpy.isnan(e1rm)
+            numpy.maximum.at(best, self.exercise[ok], e1rm[ok])
+            return {name: int(best[i]) for i, name in enumerate(self.names) if best[i] > -numpy.inf}
+        best = {}
+        for ex, w, r in zip(self.exercise, self.weight, self.reps):
+            if w != w: continue
+            e = int(w * (1 + r / 30)) if r > 1 else int(w)
+            if e > best.get(ex, -1): best[ex] = e
+        return {self.names[i]: v for i, v in best.items()}
+
+    def close(self):
+        for name, _, _ in ARCHIVE_COLUMNS:
+            col = getattr(self, name, None)
+            if isinstance(col, memoryview): col.release()
+            setattr(self, name, None)
+        self.mm.close()
+
+
+# --- TRAINING STATS ---
+VOLUME_DAYS = 28   # rolling window for volume_4w
+RECENT_SETS = 12   # sets kept per exercise for suggestions
+STATS_VERSION = 4  # bump when the snapshot layout changes; old ones get rebuilt
+
+class TrainingStats:
+    # Per-exercise aggregates kept current set by set:
+    #   e1rm   best calculate_1rm seen
+    #   best   {reps: heaviest weight} rep PRs (keys are strings so it round-trips JSON)
+    #   volume [[day ordinal, kg x reps], ...] for the last VOLUME_DAYS days, oldest first
+    #   recent [[day ordinal, weight, reps], ...] ring buffer of the last RECENT_SETS sets
+    def __init__(self, data=None):
+        self.data = data or {}
+
+    def add(self, row):
+        try: day, w, r = date.fromisoformat(str(row[0])).toordinal(), float(row[2]), int(row[3])
+        except (ValueError, IndexError): return
+        st = self.data.setdefault(CATALOG.resolve(row[1]), {"e1rm": 0, "best": {}, "volume": [], "recent": []})
+        st["e1rm"] = max(st["e1rm"], calculate_1rm(w, r))
+        if w > st["best"].get(str(r), 0): st["best"][str(r)] = w
+        st["recent"].append([day, w, r])
+        if len(st["recent"]) > RECENT_SETS: st["recent"].pop(0)
+        vol = st["volume"]
+        if vol and day < vol[-1][0] - VOLUME_DAYS + 1: return
+        for entry in reversed(vol):
+            if entry[0] == day:
+                entry[1] += w * r
+                break
+        else:
+            vol.append([day, w * r])
+            vol.sort()
+        while vol[0][0] < vol[-1][0] - VOLUME_DAYS + 1: vol.pop(0)
+
+    def volume_4w(self, ex, today=None):
+        today = (today or date.today()).toordinal()
+        return sum(v for d, v in self.data.get(ex, {}).get("volume", ()) if d > today - VOLUME_DAYS)
+
+    def pr_text(self, ex):
+        st = self.data.get(ex)
+        if not st or not st["e1rm"]: return ""
+        w, r = max((w, int(r)) for r, w in st["best"].items())
+        return f"BEST e1RM: {st['e1rm']}kg | TOP: {w:g}kg x {r}"
+
+    def last_top(self, ex):
+        # Heaviest weight of the newest session in the ring buffer; 0 if none
+        recent = self.data.get(ex, {}).get("recent")
+        return max((w for d, w, _ in recent if d == recent[-1][0]), default=0) if recent else 0
+
+    def last_trained(self, ex):
+        # Day ordinal of the newest set, from the ring buffer; None if never logged
+        recent = self.data.get(ex, {}).get("recent")
+        return recent[-1][0] if recent else None
+
+# --- PROGRESSIVE OVERLOAD ---
+# Rules from the Black Book: add INCREMENT when every set of the last session hit
+# the top of the rep range ("4. Overload"); hold after a miss; after misses in
+# two sessions running with no weight drop, deload ("6. CNS Fatigue").
+INCREMENT = 2.5
+DELOAD_FACTOR = 0.9
+
+Suggestion = namedtuple("Suggestion", "weight reps note")
+
+def suggest_next(recent, rx):
+    # Only rep-based work (sets x reps) gets a load suggestion
+    if not recent or not rx.reps or rx.seconds or rx.every: return None
+    target = (rx.sets, rx.reps)
+    sessions = []
+    for day, w, r in recent:
+        if not sessions or sessions[-1][0] != day: sessions.append((day, []))
+        sessions[-1][1].append((w, r))
+    last = sessions[-1][1]
+    top = max(w for w, _ in last)
+    if top <= 0: return None  # bodyweight work: nothing to load
+    missed = any(r < target[1] for _, r in last)
+    if not missed:
+        return Suggestion(top + INCREMENT, target[1], f"+{INCREMENT:g}kg")
+    if len(sessions) > 1:
+        prev = sessions[-2][1]
+        if any(r < target[1] for _, r in prev) and top >= max(w for w, _ in prev):
+            return Suggestion(INCREMENT * int(top * DELOAD_FACTOR / INCREMENT), target[1], "DELOAD")
+    return Suggestion(top, target[1], "HOLD")
+
+# --- EXERCISE POOLS ---
+# A Pool slot is filled at generate time by a weighted draw: each option's odds,
+# scaled down if it was trained in the last POOL_FRESH_DAYS days and again by
+# REPEAT_PENALTY if the same pool picked it in one of its last POOL_NO_REPEAT
+# sessions. A repeat is unlikely, never impossible, so odds still matter in a
+# two-option pool. Picks are recorded (iron_pools.json) only once a session is
+# used, see AppEngine.record_session. The rng is passed in so a seeded Random
+# gives a reproducible week.
+
+POOL_NO_REPEAT = 2     # sessions a pick stays penalised
+POOL_FRESH_DAYS = 7    # days since last trained at which an option gets full odds
+REPEAT_PENALTY = 0.25  # odds multiplier for a recent pick
+
+def pick_option(pool, avoid, last_trained, today, rng):
+    # last_trained: name -> day ordinal or None (TrainingStats.last_trained)
+    weights = []
+    for slot, odds in zip(pool.options, pool.odds):
+        day = last_trained(slot.name)
+        if day is not None: odds *= min(max(today - day, 1), POOL_FRESH_DAYS) / POOL_FRESH_DAYS
+        weights.append(odds * REPEAT_PENALTY if slot.name in avoid else odds)
+    return rng.choices(pool.options, weights)[0]
+
+def record_picks(picks, mode, playlist):
+    # Appends the pool choices in playlist (a generated mode session) to picks.
+    # Lists are replaced, never mutated, so a dict(picks) copy stays independent.
+    plan = PLANS.get(mode)
+    if not plan or not any(isinstance(s, Pool) for s in plan.main): return False
+    for i, slot in enumerate(plan.main):
+        if isinstance(slot, Pool) and len(plan.warmup) + i < len(playlist):
+            key = f"{mode}/{i}"
+            picks[key] = (picks.get(key, []) + [playlist[len(plan.warmup) + i].name])[-POOL_NO_REPEAT:]
+    return True
+
+# --- PROGRAM SCHEDULER ---
+# A mesocycle is planned in one pass and cached in iron_plan.json, so starting
+# today's session is a dict lookup. PHAT_WEEK rotates from the plan's first day.
+# Loaded lifts start from suggest_next and gain INCREMENT per training week; the
+# last week is a deload (half the sets, DELOAD_FACTOR load, "6. CNS Fatigue"),
+# and so is the first if most lifts already call for one.
+
+PHAT_WEEK = ("Upper Power", "Lower Power", None, "Push Hyper", "Pull Hyper", "Legs Hyper", None)  # None = rest
+MESO_WEEKS = 6
+FATIGUE_SHARE = 0.5  # share of loaded lifts on DELOAD that turns week 1 into a deload
+PLAN_VERSION = 1
+
+def deload_slot(slot):
+    rx = slot.rx
+    if not rx.sets or not rx.reps: return slot
+    sets = max(1, (rx.sets + 1) // 2)
+    return slot._replace(reps=f"{sets}x{rx.reps}", rx=rx._replace(sets=sets))
+
+def planned_load(weight, progressions, deload):
+    weight += INCREMENT * progressions
+    return INCREMENT * int(weight * DELOAD_FACTOR / INCREMENT) if deload else weight
+
+# --- LOG MERGE ---
+MERGE_RUN_ROWS = 50000  # rows sorted in memory per run
+MERGE_WINDOW = 100000   # most dedupe keys remembered at once
+
+def _merge_source(src):
+    # A log path, or any iterable of rows (e.g. store.rows())
+    if isinstance(src, str):
+        with open(src, newline='') as f:
+            for row in csv.reader(f):
+                if len(row) >= 4 and row[0] != "Date": yield row
+    else:
+        yield from src
+
+def _merge_runs(sources, tmpdir):
+    # External sort, phase 1: sorted runs of MERGE_RUN_ROWS rows on disk,
+    # each row prefixed by (source index, sequence) to keep the order stable
+    runs, buf, seq = [], [], 0
+    def spill():
+        buf.sort(key=lambda x: (x[2], x[0], x[1]))
+        path = os.path.join(tmpdir, f"run{len(runs)}.csv")
+        with open(path, 'w', newline='') as f: csv.writer(f).writerows(buf)
+        runs.append(path)
+        buf.clear()
+    for i, src in enumerate(sources):
+        for row in _merge_source(src):
+            buf.append([i, seq] + row[:5])
+            seq += 1
+            if len(buf) >= MERGE_RUN_ROWS: spill()
+    if buf: spill()
+    return runs
+
+def _read_run(path):
+    with open(path, newline='') as f:
+        for row in csv.reader(f): yield (row[2], int(row[0]), int(row[1])), int(row[0]), row[2:]
+
+def merge_logs(sources, dest):
+    """Merges logs into dest (.csv, or .db for SQLite), sorted by date.
+
+    Memory stays bounded by MERGE_RUN_ROWS and MERGE_WINDOW whatever the input
+    size. Identical (date, exercise, weight, reps) rows are deduplicated by
+    multiplicity: a set logged twice on one device and copied to another is
+    kept twice, not four times. Returns row counts and rows/second.
+    """
+    t0 = time.perf_counter()
+    stats = {"rows_in": 0, "rows_out": 0, "duplicates": 0}
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(dest))) as tmpdir:
+        runs = _merge_runs(sources, tmpdir)
+        window, day = OrderedDict(), None  # key -> [rows emitted, {source: rows seen}]
+        def merged():
+            nonlocal day
+            for _, src, row in heapq.merge(*(_read_run(p) for p in runs), key=lambda x: x[0]):
+                stats["rows_in"] += 1
+                if row[0] != day: window.clear(); day = row[0]
+                try: w = f"{float(row[2]):g}"
+                except ValueError: w = row[2].strip()
+                key = (row[1].strip(), w, row[3].strip())
+                seen = window.pop(key, None) or [0, {}]
+                window[key] = seen
+                if len(window) > MERGE_WINDOW: window.popitem(last=False)
+                n = seen[1][src] = seen[1].get(src, 0) + 1
+                if n > seen[0]:
+                    seen[0] = n
+                    stats["rows_out"] += 1
+                    yield row
+                else:
+                    stats["duplicates"] += 1
+        if dest.endswith(".db"):
+            out = SqliteStore(dest)
+            out.open()
+            out.replace(merged())
+            out.close()
+        else:
+            tmp = os.path.join(tmpdir, "merged.csv")
+            with open(tmp, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(LOG_HEADER)
+                writer.writerows(merged())
+            os.replace(tmp, dest)
+    elapsed = time.perf_counter() - t0
+    stats["seconds"] = round(elapsed, 3)
+    stats["rows_per_sec"] = int(stats["rows_in"] / elapsed) if elapsed > 0 else stats["rows_in"]
+    return stats
+
+class AppEngine:
+    def __init__(self):
+        self.store = None
+        self.last_sets = {}  # exercise -> (weight, reps) of its most recent set
+        self.indexed = False
+        self.pending = []  # rows queued by save_log, written by flush()
+        self.queue_lock = threading.Lock()
+        self.io_lock = threading.Lock()
+        self.flusher = None
+        self.rotator = None  # thread running a background auto_rotate, if any
+        self.opened = threading.Event()  # set once self.store is usable
+        self.stats = TrainingStats()
+        self.rng = random.Random()  # pool draws; seed it for a reproducible run
+        self.pool_picks = {}  # "mode/slot index" -> names picked in its last sessions
+        self.pools_dirty = False  # pool_picks changed since iron_pools.json was written
+        self.program = {}  # iron_plan.json: the current mesocycle, sessions keyed by ISO date
+        self.settings = {}  # iron_settings.json
+        self.backend = None  # BACKENDS key in use
+
+    def init_storage(self, user_data_dir, backend=None):
+        if is_android():
+            from android.storage import app_storage_path
+            self.dir = app_storage_path()
+        else:
+            self.dir = user_data_dir
+        self.settings = self.load_settings()
+        self.backend = backend or self.settings.get("backend") or STORAGE_BACKEND
+        cls = BACKENDS[self.backend]
+        self.store = cls(os.path.join(self.dir, cls.filename))
+        try: self.store.open()
+        except: pass
+        self.opened.set()
+        self.build_index()
+        self.load_stats()
+        self.load_pools()
+        self.load_program()
+        # Not in this pass: a big log would be read for the index and stats and
+        # then rewritten before the app could use it
+        self.rotate_async()
+
+    def load_settings(self):
+        try:
+            with open(os.path.join(self.dir, 'iron_settings.json')) as f: settings = json.load(f)
+            return settings if isinstance(settings, dict) else {}
+        except (OSError, ValueError): return {}
+
+    def set_backend(self, name):
+        # Persists the storage choice for the next start. SqliteStore.open migrates
+        # the CSV log, but nothing migrates back, so leaving SQLite is refused.
+        if name not in BACKENDS: raise ValueError(f"unknown backend {name!r}")
+        if self.backend == "sqlite" and name != "sqlite": raise ValueError("the SQLite log can't be moved back to CSV")
+        self.settings["backend"] = name
+        path = os.path.join(self.dir, 'iron_settings.json')
+        with open(path + '.tmp', 'w') as f: json.dump(self.settings, f)
+        os.replace(path + '.tmp', path)
+
+    def build_index(self):
+        # May run on a background thread while the user logs sets: flushes wait
+        # on io_lock, and rows still queued are replayed over the scan.
+        self.indexed = False
+        with self.io_lock:
+            idx = {}
+            try:
+                # latest() yields each spelling once; variants fold into one entry
+                for ex, w, r in self.store.latest(): idx[CATALOG.resolve(ex)] = (w, r)
+            except: return
+            with self.queue_lock:
+                for row in self.pending: idx[row[1]] = (str(row[2]), str(row[3]))
+                self.last_sets, self.indexed = idx, True
+
+    def load_stats(self):
+        # iron_stats.json is trusted only if it was written at the store's current
+        # watermark; otherwise the stats are rebuilt from the log
+        try:
+            with open(os.path.join(self.dir, 'iron_stats.json')) as f: snap = json.load(f)
+            if snap.get("version") == STATS_VERSION and snap.get("watermark") == self.store.watermark():
+                with self.queue_lock:
+                    stats = TrainingStats(snap["stats"])
+                    for row in self.pending: stats.add(row)
+                    self.stats = stats
+                return
+        except (OSError, ValueError, KeyError): pass
+        self.rebuild_stats()
+
+    def rebuild_stats(self):
+        # Full scan of the log, then a fresh snapshot
+        with self.io_lock:
+            stats = TrainingStats()
+            try:
+                for row in self.store.rows(): stats.add(row)
+            except Exception: return
+            with self.queue_lock:
+                for row in self.pending: stats.add(row)
+                self.stats = stats
+            self.save_stats()
+
+    def save_stats(self):
+        # Callers hold io_lock. Skipped while rows are queued: the snapshot must
+        # match the watermark exactly.
+        with self.queue_lock:
+            if self.pending: return
+            text = json.dumps({"version": STATS_VERSION, "watermark": self.store.watermark(), "stats": self.stats.data})
+        path = os.path.join(self.dir, 'iron_stats.json')
+        try:
+            with open(path + '.tmp', 'w') as f: f.write(text)
+            os.replace(path + '.tmp', path)
+        except OSError: pass
+
+    def load_pools(self):
+        try:
+            with open(os.path.join(self.dir, 'iron_pools.json')) as f: self.pool_picks = json.load(f)
+        except (OSError, ValueError): self.pool_picks = {}
+
+    def save_pools(self):
+        path = os.path.join(self.dir, 'iron_pools.json')
+        with self.queue_lock: data = json.dumps(self.pool_picks)
+        try:
+            with open(path + '.tmp', 'w') as f: f.write(data)
+            os.replace(path + '.tmp', path)
+        except (OSError, AttributeError): pass
+
+    def load_program(self):
+        try:
+            with open(os.path.join(self.dir, 'iron_plan.json')) as f: plan = json.load(f)
+            self.program = plan if plan.get("version") == PLAN_VERSION else {}
+        except (OSError, ValueError, AttributeError): self.program = {}
+
+    def save_program(self):
+        path = os.path.join(self.dir, 'iron_plan.json')
+        try:
+            with open(path + '.tmp', 'w') as f: json.dump(self.program, f)
+            os.replace(path + '.tmp', path)
+        except (OSError, AttributeError): pass
+
+    def recent_sets(self, ex, n=1):
+        # Last n rows for ex under any of its spellings, newest first; the store
+        # stops reading once n are found
+        names = CATALOG.spellings(ex)
+        with self.queue_lock:
+            found = [[str(c) for c in row] for row in reversed(self.pending) if row[1] in names][:n]
+        if len(found) < n and self.store:
+            try: found.extend(self.store.recent(names, n - len(found)))
+            except: pass
+        return found
+
+    def save_log(self, ex, w, r):
+        # Queues the row; the disk write happens later on a background thread
+        if not self.store: return
+        with self.queue_lock:
+            ex = CATALOG.resolve(ex)
+            row = [str(date.today()), ex, w, r, calculate_1rm(w, r)]
+            self.pending.append(row)
+            self.stats.add(row)
+            self.schedule_flush()
+            self.last_sets[ex] = (str(w), str(r))
+
+    def schedule_flush(self):
+        # Caller holds queue_lock
+        if not self.flusher:
+            self.flusher = threading.Timer(FLUSH_DELAY, self.flush)
+            self.flusher.daemon = True
+            self.flusher.start()
+
+    def flush(self):
+        # Synchronously writes every queued row. Returns False if the write failed;
+        # the rows stay queued for the next attempt. Nothing queued returns at once,
+        # without waiting on io_lock behind a rotation or merge.
+        with self.queue_lock:
+            if not self.pending and not self.pools_dirty: return True
+        with self.io_lock:
+            with self.queue_lock:
+                if self.flusher:
+                    self.flusher.cancel()
+                    self.flusher = None
+                rows, self.pending = self.pending, []
+                pools, self.pools_dirty = self.pools_dirty, False
+            if pools: self.save_pools()
+            if not rows: return True
+            try:
+                self.store.append(rows)
+                self.save_stats()
+            except Exception:
+                with self.queue_lock: self.pending[:0] = rows
+                return False
+        # Flushes can run on the UI thread (on_pause), so rotation goes to its own
+        self.rotate_async()
+        return True
+
+    def flush_async(self):
+        threading.Thread(target=self.flush, daemon=True).start()
+
+    def compact_archive(self):
+        # Rewrites iron_archive.bin from the full log; returns the row count
+        self.flush()
+        return write_archive(self.store.rows(), os.path.join(self.dir, 'iron_archive.bin'))
+
+    def import_logs(self, paths):
+        # Merges other devices' logs into this one, then reindexes
+        self.flush()
+        with self.io_lock:
+            tmp = os.path.join(self.dir, 'iron_merge.csv')
+            stats = merge_logs([self.store.rows()] + list(paths), tmp)
+            if isinstance(self.store, CsvStore):
+                self.store.absorb(tmp)
+            else:
+                self.store.replace(_merge_source(tmp))
+                os.remove(tmp)
+        self.build_index()
+        self.rebuild_stats()
+        return stats
+
+    def rotate_log(self, max_rows=None, by_year=False, compress=True):
+        # CSV backend only (SQLite is already indexed); returns the new segments
+        if not isinstance(self.store, CsvStore): return []
+        self.flush()
+        with self.io_lock:
+            segments = self.store.rotate(max_rows, by_year, compress)
+            self.save_stats()
+        return segments
+
+    def needs_rotation(self):
+        return isinstance(self.store, CsvStore) and self.store.live_count > ROTATE_ROWS
+
+    def auto_rotate(self):
+        # The ROTATE_ROWS policy: checked after startup and after every flush,
+        # using the live row count the store already tracks
+        return self.rotate_log() if self.needs_rotation() else []
+
+    def rotate_async(self):
+        # auto_rotate on its own thread when it has work; self.rotator is that
+        # thread, for callers that need to wait on it
+        if self.needs_rotation():
+            self.rotator = threading.Thread(target=self.auto_rotate, daemon=True)
+            self.rotator.start()
+        return self.rotator
+
+    def changes_since(self, cursor=None, limit=None):
+        # For sync: up to limit rows on disk after cursor and the next cursor. Rows
+        # still queued are picked up after their flush.
+        with self.io_lock: return self.store.changes(cursor, limit)
+
+    def open_archive(self):
+        path = os.path.join(self.dir, 'iron_archive.bin')
+        return HistoryArchive(path) if os.path.exists(path) else None
+
+    def get_history(self, ex):
+        last = self.last_sets.get(ex)
+        if not last and not self.indexed:
+            rows = self.recent_sets(ex)
+            if rows: last = (rows[0][2], rows[0][3])
+        if not last: return "New Exercise"
+        return f"LAST: {last[0]}kg x {last[1]}"
+
+    def suggest(self, slot):
+        # Next target from the in-memory ring buffer; no log reads
+        return suggest_next(self.stats.data.get(slot.name, {}).get("recent"), slot.rx)
+
+    def generate(self, mode, today=None, rng=None, picks=None):
+        # Warmup/cooldown Slots are shared as-is; only workout slots get fresh history.
+        # Until the index is built, history comes from the tail reader. rng and
+        # picks default to the engine's own pool state; planning passes copies.
+        self.opened.wait(STORAGE_WAIT)
+        today = (today or date.today()).toordinal()
+        plan = PLANS.get(mode) or PLANS[None]
+        playlist = list(plan.warmup)
+        picks = self.pool_picks if picks is None else picks
+        for i, slot in enumerate(plan.main):
+            if isinstance(slot, Pool):
+                avoid = picks.get(f"{mode}/{i}", [])
+                slot = pick_option(slot, avoid, self.stats.last_trained, today, rng or self.rng)
+            playlist.append(slot._replace(history=self.get_history(slot.name), suggest=self.suggest(slot)))
+        playlist.extend(plan.cooldown)
+        return playlist
+
+    def record_session(self, mode, playlist):
+        # Called once a generated session is actually used (its first logged set),
+        # so previews and abandoned workouts don't advance the pool rotation.
+        # Runs on the UI thread: iron_pools.json is written by the next flush.
+        with self.queue_lock:
+            if record_picks(self.pool_picks, mode, playlist):
+                self.pools_dirty = True
+                self.schedule_flush()
+
+    def plan_program(self, start=None, weeks=MESO_WEEKS):
+        # Draws every session's pools up front and stores per-slot targets; history
+        # is read once here. Runs on the storage thread while the UI may generate,
+        # so the draws use a local Random and a copy of pool_picks: the live
+        # rotation only moves when sessions are used (record_session).
+        start = start or date.today()
+        rng, picks = random.Random(start.toordinal()), dict(self.pool_picks)
+        sessions, loads = {}, {}
+        for d in range(weeks * 7):
+            mode = PHAT_WEEK[d % 7]
+            if not mode: continue
+            day = start + timedelta(days=d)
+            plan = PLANS[mode]
+            playlist = self.generate(mode, day, rng, picks)
+            record_picks(picks, mode, playlist)
+            main = playlist[len(plan.warmup):len(plan.warmup) + len(plan.main)]
+            sessions[day.isoformat()] = {"mode": mode, "week": d // 7 + 1, "slots": [[s.name] for s in main]}
+            for s in main:
+                if s.suggest: loads[s.name] = s.suggest
+        fatigued = sum(1 for s in loads.values() if s.note == "DELOAD")
+        deloads = {weeks} | ({1} if loads and fatigued >= FATIGUE_SHARE * len(loads) else set())
+        for session in sessions.values():
+            week, deload = session["week"], session["week"] in deloads
+            session["deload"] = deload
+            progressions = sum(1 for w in range(1, week) if w not in deloads)
+            for entry in session["slots"]:
+                target = loads.get(entry[0])
+                if not target: continue
+                # A DELOAD suggestion is already cut; plan from the top weight behind it
+                # so week 1 deloads once, whether by the fatigue rule or the lift's own
+                if target.note == "DELOAD":
+                    weight = planned_load(self.stats.last_top(entry[0]), progressions, deload or week == 1)
+                else:
+                    weight = planned_load(target.weight, progressions, deload)
+                entry += [weight, target.reps]
+        self.program = {"version": PLAN_VERSION, "start": start.isoformat(), "weeks": weeks, "sessions": sessions}
+        self.save_program()
+        return self.program
+
+    def ensure_program(self, today=None):
+        # Replans once today falls outside the cached mesocycle
+        today = today or date.today()
+        try:
+            start = date.fromisoformat(self.program["start"])
+            if start <= today < start + timedelta(weeks=self.program["weeks"]): return self.program
+        except (KeyError, ValueError): pass
+        return self.plan_program(today)
+
+    def session_for(self, day=None):
+        # The plan entry for day (default today): mode, week, deload, slots; None on rest days
+        return self.program.get("sessions", {}).get((day or date.today()).isoformat())
+
+    def todays_session(self, today=None):
+        # (mode, playlist) from the cached plan, or None on a rest day or when the
+        # plan no longer matches EXERCISE_DB
+        session = self.session_for(today)
+        plan = session and PLANS.get(session["mode"])
+        if not plan or len(plan.main) != len(session["slots"]): return None
+        playlist = list(plan.warmup)
+        for tmpl, entry in zip(plan.main, session["slots"]):
+            options = tmpl.options if isinstance(tmpl, Pool) else (tmpl,)
+            slot = next((o for o in options if o.name == entry[0]), None)
+            if slot is None: return None
+            if session["deload"]: slot = deload_slot(slot)
+            note = "DELOAD" if session["deload"] else f"WEEK {session['week']}"
+            # No planned load (e.g. planned before any history): live suggestion
+            target = Suggestion(entry[1], entry[2], note) if len(entry) > 2 else self.suggest(slot)
+            playlist.append(slot._replace(history=self.get_history(slot.name), suggest=target))
+        playlist.extend(plan.cooldown)
+        return session["mode"], playlist
+
+if __name__ == '__main__':
+    import argparse
+    ap = argparse.ArgumentParser(description="Iron Vault log maintenance")
+    ap.add_argument("command", choices=["rebuild-stats", "merge", "rotate", "plan", "use-sqlite"])
+    ap.add_argument("dir", help="folder holding the log")
+    ap.add_argument("logs", nargs="*", help="merge: other devices' iron_log.csv files")
+    ap.add_argument("--backend", choices=sorted(BACKENDS), help="default: iron_settings.json, else csv")
+    ap.add_argument("--by-year", action="store_true", help="rotate: one segment per past year")
+    args = ap.parse_args()
+    eng = AppEngine()
+    eng.init_storage(args.dir, args.backend)
+    if args.command == "use-sqlite":
+        eng.set_backend("sqlite")
+        print("SQLite storage from the next start")
+    elif args.command == "rebuild-stats":
+        eng.rebuild_stats()
+        print(f"{len(eng.stats.data)} exercises -> {os.path.join(eng.dir, 'iron_stats.json')}")
+    elif args.command == "merge":
+        print(json.dumps(eng.import_logs(args.logs)))
+    elif args.command == "rotate":
+        for seg in eng.rotate_log(by_year=args.by_year):
+            print(f"{seg['file']}: {seg['rows']} rows {seg['first']}..{seg['last']}")
+    elif args.command == "plan":
+        for day, session in sorted(eng.plan_program()["sessions"].items()):
+            print(f"{day} W{session['week']} {session['mode']}{' (deload)' if session['deload'] else ''}")
+    if eng.rotator: eng.rotator.join()  # a startup rotation must finish before exit
@@ -1,192 +1,22 @@
-import os
-import csv
-import random
-from datetime import date
+import time
+_T0 = time.perf_counter()  # startup report baseline, taken before the heavy imports
+
+import math
+import threading
+from collections import namedtuple
 from kivy.clock import Clock  # CRITICAL: Needed for timer
+from kivy.factory import Factory
 from kivy.lang import Builder
-from kivy.properties import StringProperty, NumericProperty
+from kivy.logger import Logger
+from kivy.metrics import dp
+from kivy.properties import ListProperty, StringProperty, ObjectProperty
+from kivy.uix.screenmanager import ScreenManager
 from kivymd.app import MDApp
+from kivymd.uix.gridlayout import MDGridLayout
+from kivymd.uix.label import MDLabel
 from kivymd.uix.screen import MDScreen
-from kivy.utils import platform
-
-# =========================================================================
-# 1. MATH & LOGIC
-# =========================================================================
-
-def calculate_plates(weight):
-    try:
-        w = float(weight)
-        if w < 20: return "Bar Only"
-        rem = (w - 20) / 2
-        plates = [25, 20, 15, 10, 5, 2.5, 1.25]
-        load = []
-        for p in plates:
-            while rem >= p:
-                load.append(str(p))
-                rem -= p
-        return f"Side: {', '.join(load)}" if load else "Bar Only"
-    except: return "Invalid"
-
-def calculate_1rm(weight, reps):
-    try:
-        w, r = float(weight), int(reps)
-        return int(w * (1 + r / 30)) if r > 1 else int(w)
-    except: return 0
-
-# =========================================================================
-# 2. THE ETERNAL DATABASE
-# =========================================================================
-
-GUIDE_DATA = {
-    "1. The Iron Philosophy": {"subtitle": "POWER + HYPERTROPHY", "body": "The Hybrid Athlete needs Strength and Size. PHAT combines them.\n\n• Days 1-2: Power (3-5 Reps). Builds density.\n• Days 4-6: Hypertrophy (8-15 Reps). Builds size.\n\nHeavy lifting builds the engine. Volume builds the fuel tank."},
-    "2. The RAMP Warmup": {"subtitle": "DON'T STRETCH COLD", "body": "• R (Raise): Sweat first.\n• A (Activate): Glutes/Core.\n• M (Mobilize): Dynamic moves.\n• P (Potentiate): Warmup sets."},
-    "3. The Big 3": {"subtitle": "TECHNICAL MASTERY", "body": "SQUAT: Tripod foot. Break bar across traps.\nBENCH: Leg drive back. Arch tight.\nDEADLIFT: Pull slack. Push floor away."},
-    "4. Overload": {"subtitle": "DO MORE", "body": "1. Intensity (+2.5kg)\n2. Volume (+1 Rep)\n3. Density (Less Rest)\n4. Technique (Slower)"},
-    "5. Nutrition": {"subtitle": "FUEL", "body": "Surplus = Growth.\nDeficit = Cut.\nProtein = 1g/lb.\nSleep = 8 Hours (The best steroid)."},
-    "6. CNS Fatigue": {"subtitle": "SYSTEM MANAGEMENT", "body": "If grip is weak or motivation is zero, you are fried. Take a deload week (50% volume)."},
-    "7. Equipment": {"subtitle": "TOOLS", "body": "Barbells = Mass.\nDumbbells = Balance.\nCables = Isolation.\nMachines = Failure safely."},
-    "8. Injury": {"subtitle": "STAY SAFE", "body": "Good Pain = Dull ache (DOMS).\nBad Pain = Sharp/Joint.\nFix: Form > Weight."}
-}
-
-EXERCISE_DB = {
-    # --- PHAT SPLIT (FULL BODY COVERAGE GUARANTEED) ---
-    "Upper Power": [
-        {"name": "Bench Press", "reps": "3x5", "cue": "Chest Power", "icon": "arm-flex", "type": "POWER"},
-        {"name": "Bent Over Rows", "reps": "3x5", "cue": "Back Thickness", "icon": "rowing", "type": "POWER"},
-        {"name": "Overhead Press", "reps": "3x6", "cue": "Shoulder Mass", "icon": "human-handsup", "type": "POWER"},
-        {"name": "Weighted Pullups", "reps": "3x6", "cue": "Lat Width", "icon": "human-handsup", "type": "POWER"},
-        {"name": "Barbell Curls", "reps": "3x8", "cue": "Bicep Mass", "icon": "arm-flex", "type": "ACC"},
-        {"name": "Skullcrushers", "reps": "3x8", "cue": "Tricep Mass", "icon": "arm-flex-outline", "type": "ACC"}
-    ],
-    "Lower Power": [
-        {"name": "Squat", "reps": "3x5", "cue": "Quad Power", "icon": "human-male-height", "type": "POWER"},
-        {"name": "Deadlift", "reps": "3x5", "cue": "Posterior Chain", "icon": "weight-lifter", "type": "POWER"},
-        {"name": "Leg Press", "reps": "3x10", "cue": "Leg Volume", "icon": "car-brake-pedal", "type": "ACC"},
-        {"name": "Leg Curl", "reps": "3x10", "cue": "Hamstrings", "icon": "seat-recline-normal", "type": "ACC"},
-        {"name": "Calf Raise", "reps": "4x15", "cue": "Calves", "icon": "arrow-up-bold", "type": "ACC"}
-    ],
-    "Push Hyper": [
-        {"name": "Inc DB Press", "reps": "3x10", "cue": "Upper Chest", "icon": "dumbbell", "type": "HYPER"},
-        {"name": "Seated Press", "reps": "3x12", "cue": "Shoulders", "icon": "human-handsup", "type": "HYPER"},
-        {"name": "Cable Fly", "reps": "3x15", "cue": "Chest Iso", "icon": "butterfly", "type": "HYPER"},
-        {"name": "Lat Raise", "reps": "4x15", "cue": "Side Delts", "icon": "bird", "type": "HYPER"},
-        {"name": "Tricep Pushdown", "reps": "3x15", "cue": "Triceps", "icon": "arrow-down-bold", "type": "HYPER"},
-        {"name": "Dips", "reps": "Failure", "cue": "Burnout", "icon": "format-vertical-align-bottom", "type": "FINISHER"}
-    ],
-    "Pull Hyper": [
-        {"name": "Barbell Rows", "reps": "4x10", "cue": "Back Density", "icon": "rowing", "type": "HYPER"},
-        {"name": "Lat Pulldown", "reps": "3x12", "cue": "Back Width", "icon": "tshirt-v", "type": "HYPER"},
-        {"name": "Face Pulls", "reps": "4x15", "cue": "Rear Delts", "icon": "eye-outline", "type": "HYPER"},
-        {"name": "Shrugs", "reps": "3x15", "cue": "Traps", "icon": "tshirt-v", "type": "HYPER"},
-        {"name": "Hammer Curl", "reps": "3x12", "cue": "Forearms", "icon": "gavel", "type": "HYPER"},
-        {"name": "Preacher Curl", "reps": "3x12", "cue": "Bicep Peak", "icon": "arm-flex", "type": "HYPER"}
-    ],
-    "Legs Hyper": [
-        {"name": "Front Squat", "reps": "3x10", "cue": "Quads", "icon": "human-male-height", "type": "HYPER"},
-        {"name": "Lunges", "reps": "3x20", "cue": "Unilateral", "icon": "walk", "type": "HYPER"},
-        {"name": "Leg Ext", "reps": "3x15", "cue": "Quad Iso", "icon": "seat-recline-normal", "type": "HYPER"},
-        {"name": "Goblet Squat", "reps": "3x12", "cue": "Depth", "icon": "dumbbell", "type": "HYPER"},
-        {"name": "Seated Calf", "reps": "4x20", "cue": "Calves", "icon": "arrow-up-bold", "type": "HYPER"}
-    ],
-    
-    # --- SPECIALTY SPLITS ---
-    "Bicep Blaster": [{"name": "BB Curl", "reps": "4x8", "icon": "arm-flex"}, {"name": "Inc Curl", "reps": "3x10", "icon": "dumbbell"}, {"name": "Hammer", "reps": "3x12", "icon": "gavel"}, {"name": "21s", "reps": "2 Sets", "icon": "flash"}],
-    "Tricep Torture": [{"name": "C.G. Bench", "reps": "4x8", "icon": "arm-flex-outline"}, {"name": "Skullcrush", "reps": "3x10", "icon": "dumbbell"}, {"name": "Pushdown", "reps": "3x15", "icon": "arrow-down-bold"}, {"name": "Dips", "reps": "Fail", "icon": "format-vertical-align-bottom"}],
-    "Chest Focus": [{"name": "Bench", "reps": "4x8", "icon": "arm-flex"}, {"name": "Inc DB", "reps": "3x10", "icon": "dumbbell"}, {"name": "Dips", "reps": "3xFail", "icon": "format-vertical-align-bottom"}, {"name": "Fly", "reps": "3x15", "icon": "butterfly"}, {"name": "Pushups", "reps": "2xFail", "icon": "arrow-down-bold"}],
-    "Back Focus": [{"name": "Deadlift", "reps": "3x5", "icon": "weight-lifter"}, {"name": "Pullups", "reps": "3xFail", "icon": "human-handsup"}, {"name": "T-Bar", "reps": "3x10", "icon": "rowing"}, {"name": "Pulldown", "reps": "3x15", "icon": "arrow-down-bold"}],
-    "Shoulder Focus": [{"name": "OHP", "reps": "4x8", "icon": "human-handsup"}, {"name": "Arnold", "reps": "3x12", "icon": "dumbbell"}, {"name": "Lat Raise", "reps": "5x15", "icon": "bird"}, {"name": "Face Pull", "reps": "3x15", "icon": "eye-outline"}],
-    "Leg Focus": [{"name": "Squat", "reps": "4x8", "icon": "human-male-height"}, {"name": "Leg Press", "reps": "3x12", "icon": "car-brake-pedal"}, {"name": "Lunges", "reps": "3x20", "icon": "walk"}, {"name": "Leg Curl", "reps": "3x15", "icon": "seat-recline-normal"}],
-    
-    # --- CONDITIONING & FLOWS ---
-    "HIIT": [{"name": "Burpees", "reps": "45s", "icon": "run-fast"}, {"name": "Box Jumps", "reps": "45s", "icon": "arrow-up-bold"}, {"name": "Climbers", "reps": "45s", "icon": "run"}],
-    "Tabata": [{"name": "Sprints", "reps": "20s/10s", "icon": "run-fast"}, {"name": "Swings", "reps": "20s/10s", "icon": "kettlebell"}],
-    "EMOM": [{"name": "Thrusters", "reps": "10/min", "icon": "dumbbell"}, {"name": "Pullups", "reps": "5/min", "icon": "human-handsup"}],
-    "Animal Flow": [
-        {"name": "Beast Crawl", "reps": "60s", "cue": "Knees Hovering", "icon": "dog-side"},
-        {"name": "Crab Walk", "reps": "60s", "cue": "Hips High", "icon": "human-handsdown"},
-        {"name": "Scorpion Reach", "reps": "10/side", "cue": "Rotate Hips", "icon": "yoga"},
-        {"name": "Ape Hops", "reps": "60s", "cue": "Lateral", "icon": "run"}
-    ],
-    
-    # --- RECOVERY ---
-    "Desk Undo": [{"name": "Chin Tucks", "reps": "20 reps", "icon": "head"}, {"name": "Doorway Stretch", "reps": "60s", "icon": "door"}, {"name": "Thoracic Ext", "reps": "60s", "icon": "yoga"}],
-    "Squat Primer": [{"name": "90/90", "reps": "60s", "icon": "seat-recline-normal"}, {"name": "Ankle Rocks", "reps": "20 reps", "icon": "foot-print"}, {"name": "Goblet Hold", "reps": "60s", "icon": "dumbbell"}],
-    "Mobility": [{"name": "Cat Cow", "reps": "60s", "icon": "yoga"}, {"name": "90/90", "reps": "60s", "icon": "seat-recline-normal"}, {"name": "Deep Squat", "reps": "60s", "icon": "human-male-height"}]
-}
-
-WARMUPS = [
-    {"name": "Arm Circles", "reps": "30s", "cue": "Dynamic", "icon": "refresh", "type": "WARMUP"},
-    {"name": "Band Pulls", "reps": "20 Reps", "cue": "Rear Delts", "icon": "arrow-left-right", "type": "WARMUP"}
-]
-
-COOLDOWNS = {
-    "General": {"name": "Childs Pose", "reps": "60s", "cue": "Relax Spine", "icon": "human-child", "type": "COOLDOWN"}
-}
-
-# =========================================================================
-# 3. ENGINE (SAFE STORAGE)
-# =========================================================================
-
-class AppEngine:
-    def __init__(self):
-        self.log_file = None 
-
-    def init_storage(self, user_data_dir):
-        if platform == 'android':
-            from android.storage import app_storage_path
-            self.dir = app_storage_path()
-        else:
-            self.dir = user_data_dir
-        self.log_file = os.path.join(self.dir, 'iron_log.csv')
-        if not os.path.exists(self.log_file):
-            try:
-                with open(self.log_file, 'w', newline='') as f:
-                    csv.writer(f).writerow(["Date", "Exercise", "Weight", "Reps", "1RM"])
-            except: pass
-
-    def save_log(self, ex, w, r):
-        if not self.log_file: return
-        try:
-            with open(self.log_file, 'a', newline='') as f:
-                csv.writer(f).writerow([date.today(), ex, w, r, calculate_1rm(w, r)])
-        except: pass
-
-    def get_history(self, ex):
-        if not self.log_file or not os.path.exists(self.log_file): return "New Exercise"
-        try:
-            with open(self.log_file, 'r') as f:
-                rows = list(csv.reader(f))
-                for row in reversed(rows[1:]):
-                    if row[1] == ex: return f"LAST: {row[2]}kg x {row[3]}"
-        except: pass
-        return "New Exercise"
-
-    def generate(self, mode):
-        playlist = []
-        # Warmup (Skip for flows/cardio)
-        if mode not in ["Mobility", "HIIT", "Tabata", "EMOM", "Desk Undo", "Squat Primer", "Animal Flow"]:
-            playlist.extend([w.copy() for w in WARMUPS])
-            for p in playlist: p["history"] = "-" 
-
-        # Main Workout
-        if mode in EXERCISE_DB:
-            for slot in EXERCISE_DB[mode]:
-                if "type" in slot and slot["type"] == "pool":
-                    ex = random.choice(slot["options"]).copy()
-                else:
-                    ex = slot.copy()
-                ex["history"] = self.get_history(ex["name"])
-                ex["type"] = "WORKOUT"
-                if "icon" not in ex: ex["icon"] = "dumbbell"
-                playlist.append(ex)
-
-        # Cooldown
-        if mode not in ["Mobility", "HIIT", "Tabata", "EMOM", "Desk Undo", "Squat Primer", "Animal Flow"]:
-            cd = COOLDOWNS["General"].copy()
-            cd["history"] = "-"
-            playlist.append(cd)
-
-        return playlist
+from core import (AppEngine, GUIDE_DATA, INTERVAL_MODES, MODE_CATALOG, build_timeline,
+                  calculate_plates, monotonic, phase_index, rest_seconds)
 
 engine = AppEngine()
 
@@ -220,11 +50,47 @@ KV = '''
     bold: True
     font_style: "Caption"
 
-ScreenManager:
-    HomeScreen:
-    WorkoutScreen:
-    GuideScreen:
-    ToolsScreen:
+<HomeCard@NavCard>:
+    mode: ""
+    height: self.parent.height if self.parent else dp(110)
+    on_release: app.start_workout(self.mode)
+    NavIcon:
+        id: icon
+    NavText:
+        id: label
+
+<TodayCard@NavCard>:
+    text: ""
+    on_release: app.start_today()
+    NavIcon:
+        icon: "calendar-today"
+    NavText:
+        text: root.text
+
+<NavRow>:
+    adaptive_height: False
+
+<SectionHeader@MDLabel>:
+    theme_text_color: "Custom"
+    bold: True
+
+<WelcomeCard@MDCard>:
+    radius: [20]
+    md_bg_color: 0.12, 0.12, 0.12, 1
+    padding: "20dp"
+    MDBoxLayout:
+        orientation: 'vertical'
+        MDLabel:
+            text: "WELCOME BACK"
+            theme_text_color: "Custom"
+            text_color: 0.5, 0.5, 0.5, 1
+            font_style: "Caption"
+        MDLabel:
+            text: "READY TO LIFT?"
+            theme_text_color: "Custom"
+            text_color: 1, 1, 1, 1
+            font_style: "H5"
+            bold: True
 
 <HomeScreen>:
     name: 'home'
@@ -240,228 +106,23 @@ ScreenManager:
             specific_text_color: 0, 1, 0.5, 1
             title_color: 0, 1, 0.5, 1
 
-        ScrollView:
-            MDBoxLayout:
+        # Rows come from core.MODE_CATALOG (see home_rows); only the visible
+        # ones exist as widgets and they are recycled while scrolling
+        RecycleView:
+            id: grid
+            key_viewclass: 'viewclass'
+            key_size: 'height'
+            RecycleBoxLayout:
                 orientation: 'vertical'
                 padding: "20dp"
                 spacing: "20dp"
-                adaptive_height: True
-
-                # HEADER
-                MDCard:
-                    size_hint_y: None
-                    height: "80dp"
-                    radius: [20]
-                    md_bg_color: 0.12, 0.12, 0.12, 1
-                    padding: "20dp"
-                    MDBoxLayout:
-                        orientation: 'vertical'
-                        MDLabel:
-                            text: "WELCOME BACK"
-                            theme_text_color: "Custom"
-                            text_color: 0.5, 0.5, 0.5, 1
-                            font_style: "Caption"
-                        MDLabel:
-                            text: "READY TO LIFT?"
-                            theme_text_color: "Custom"
-                            text_color: 1, 1, 1, 1
-                            font_style: "H5"
-                            bold: True
-
-                # --- PHAT ---
-                MDLabel:
-                    text: "PHAT SYSTEM"
-                    theme_text_color: "Custom"
-                    text_color: 0, 1, 0.5, 1
-                    bold: True
-                    adaptive_height: True
-
-                MDGridLayout:
-                    cols: 2
-                    spacing: "15dp"
-                    adaptive_height: True
-                    NavCard:
-                        on_release: app.start_workout("Upper Power")
-                        NavIcon:
-                            icon: "arm-flex"
-                        NavText:
-                            text: "UPPER POWER"
-                    NavCard:
-                        on_release: app.start_workout("Lower Power")
-                        NavIcon:
-                            icon: "weight-lifter"
-                        NavText:
-                            text: "LOWER POWER"
-
-                MDGridLayout:
-                    cols: 3
-                    spacing: "10dp"
-                    adaptive_height: True
-                    NavCard:
-                        height: "90dp"
-                        on_release: app.start_workout("Push Hyper")
-                        NavIcon:
-                            icon: "arrow-up-bold-box-outline"
-                        NavText:
-                            text: "PUSH"
-                    NavCard:
-                        height: "90dp"
-                        on_release: app.start_workout("Pull Hyper")
-                        NavIcon:
-                            icon: "arrow-down-bold-box-outline"
-                        NavText:
-                            text: "PULL"
-                    NavCard:
-                        height: "90dp"
-                        on_release: app.start_workout("Legs Hyper")
-                        NavIcon:
-                            icon: "run"
-                        NavText:
-                            text: "LEGS"
-
-                # --- SPECIALTY ---
-                MDLabel:
-                    text: "SPECIALTY"
-                    theme_text_color: "Custom"
-                    text_color: 1, 0.7, 0, 1
-                    bold: True
-                    adaptive_height: True
-
-                MDGridLayout:
-                    cols: 3
-                    spacing: "10dp"
-                    adaptive_height: True
-                    NavCard:
-                        height: "90dp"
-                        on_release: app.start_workout("Bicep Blaster")
-                        NavIcon:
-                            icon: "arm-flex"
-                            text_color: 1, 0.7, 0, 1
-                        NavText:
-                            text: "BICEPS"
-                    NavCard:
-                        height: "90dp"
-                        on_release: app.start_workout("Tricep Torture")
-                        NavIcon:
-                            icon: "arm-flex-outline"
-                            text_color: 1, 0.7, 0, 1
-                        NavText:
-                            text: "TRICEPS"
-                    NavCard:
-                        height: "90dp"
-                        on_release: app.start_workout("Chest Focus")
-                        NavIcon:
-                            icon: "dumbbell"
-                            text_color: 1, 0.7, 0, 1
-                        NavText:
-                            text: "CHEST"
-                    NavCard:
-                        height: "90dp"
-                        on_release: app.start_workout("Back Focus")
-                        NavIcon:
-                            icon: "weight-lifter"
-                            text_color: 1, 0.7, 0, 1
-                        NavText:
-                            text: "BACK"
-                    NavCard:
-                        height: "90dp"
-                        on_release: app.start_workout("Shoulder Focus")
-                        NavIcon:
-                            icon: "human-handsup"
-                            text_color: 1, 0.7, 0, 1
-                        NavText:
-                            text: "SHOULDERS"
-                    NavCard:
-                        height: "90dp"
-                        on_release: app.start_workout("Leg Focus")
-                        NavIcon:
-                            icon: "human-male-height"
-                            text_color: 1, 0.7, 0, 1
-                        NavText:
-                            text: "LEGS"
-
-                # --- CONDITIONING ---
-                MDLabel:
-                    text: "CONDITIONING"
-                    theme_text_color: "Custom"
-                    text_color: 0, 0.8, 1, 1
-                    bold: True
-                    adaptive_height: True
-
-                MDGridLayout:
-                    cols: 2
-                    spacing: "10dp"
-                    adaptive_height: True
-                    NavCard:
-                        height: "80dp"
-                        on_release: app.start_workout("HIIT")
-                        NavIcon:
-                            icon: "run-fast"
-                            text_color: 0, 0.8, 1, 1
-                        NavText:
-                            text: "HIIT"
-                    NavCard:
-                        height: "80dp"
-                        on_release: app.start_workout("Animal Flow")
-                        NavIcon:
-                            icon: "dog-side"
-                            text_color: 0, 0.8, 1, 1
-                        NavText:
-                            text: "ANIMAL FLOW"
-                    NavCard:
-                        height: "80dp"
-                        on_release: app.start_workout("Tabata")
-                        NavIcon:
-                            icon: "timer-sand"
-                            text_color: 0, 0.8, 1, 1
-                        NavText:
-                            text: "TABATA"
-                    NavCard:
-                        height: "80dp"
-                        on_release: app.start_workout("EMOM")
-                        NavIcon:
-                            icon: "timer-outline"
-                            text_color: 0, 0.8, 1, 1
-                        NavText:
-                            text: "EMOM"
-
-                # --- RECOVERY ---
-                MDLabel:
-                    text: "RECOVERY"
-                    theme_text_color: "Custom"
-                    text_color: 0.5, 0.5, 1, 1
-                    bold: True
-                    adaptive_height: True
-
-                MDGridLayout:
-                    cols: 3
-                    spacing: "10dp"
-                    adaptive_height: True
-                    NavCard:
-                        height: "80dp"
-                        on_release: app.start_workout("Desk Undo")
-                        NavIcon:
-                            icon: "chair-rolling"
-                            text_color: 0.5, 0.5, 1, 1
-                        NavText:
-                            text: "DESK UNDO"
-                    NavCard:
-                        height: "80dp"
-                        on_release: app.start_workout("Squat Primer")
-                        NavIcon:
-                            icon: "human-male-height"
-                            text_color: 0.5, 0.5, 1, 1
-                        NavText:
-                            text: "PRIMER"
-                    NavCard:
-                        height: "80dp"
-                        on_release: app.start_workout("Mobility")
-                        NavIcon:
-                            icon: "yoga"
-                            text_color: 0.5, 0.5, 1, 1
-                        NavText:
-                            text: "FLOW"
+                default_size_hint: 1, None
+                size_hint_y: None
+                height: self.minimum_height
+'''
 
+# Parsed only when the screen is first needed (see IronVaultApp.screen)
+WORKOUT_KV = '''
 <WorkoutScreen>:
     name: 'workout'
     MDBoxLayout:
@@ -469,13 +130,13 @@ ScreenManager:
         md_bg_color: 0.08, 0.08, 0.08, 1
         
         MDTopAppBar:
-            title: root.phase
+            title: root.view.phase
             left_action_items: [["arrow-left", lambda x: root.exit()]]
             md_bg_color: 0.08, 0.08, 0.08, 1
             specific_text_color: 0, 1, 0.5, 1
 
         MDProgressBar:
-            value: root.progress
+            value: root.view.progress
             color: 0, 1, 0.5, 1
             size_hint_y: None
             height: "4dp"
@@ -495,14 +156,14 @@ ScreenManager:
                 elevation: 4
 
                 MDIcon:
-                    icon: root.ex_icon
+                    icon: root.view.icon
                     halign: "center"
                     font_size: "60sp"
                     theme_text_color: "Custom"
                     text_color: 0, 1, 0.5, 1
                 
                 MDLabel:
-                    text: root.ex_name
+                    text: root.view.name
                     halign: "center"
                     font_style: "H4"
                     bold: True
@@ -514,21 +175,28 @@ ScreenManager:
                     color: 0.3, 0.3, 0.3, 1
 
                 MDLabel:
-                    text: "TARGET: " + root.ex_reps
+                    text: root.view.target
                     halign: "center"
                     theme_text_color: "Custom"
                     text_color: 0, 1, 0.5, 1
                     bold: True
 
                 MDLabel:
-                    text: root.ex_hist
+                    text: root.view.hist
                     halign: "center"
                     theme_text_color: "Custom"
                     text_color: 0.6, 0.6, 0.6, 1
                     font_style: "Caption"
 
                 MDLabel:
-                    text: '"' + root.ex_cue + '"'
+                    text: root.view.pr
+                    halign: "center"
+                    theme_text_color: "Custom"
+                    text_color: 1, 0.7, 0, 1
+                    font_style: "Caption"
+
+                MDLabel:
+                    text: root.view.cue
                     halign: "center"
                     theme_text_color: "Custom"
                     text_color: 1, 0.8, 0, 1
@@ -582,6 +250,18 @@ ScreenManager:
                 on_release: root.next()
             
             Widget:
+'''
+
+GUIDE_KV = '''
+<GuideCard@MDCard>:
+    orientation: 'vertical'
+    padding: "15dp"
+    spacing: "10dp"
+    radius: [15]
+    md_bg_color: 0.15, 0.15, 0.15, 1
+    size_hint_y: None
+    height: self.minimum_height
+    elevation: 3
 
 <GuideScreen>:
     name: 'guide'
@@ -601,7 +281,9 @@ ScreenManager:
                 padding: "20dp"
                 spacing: "30dp"
                 adaptive_height: True
+'''
 
+TOOLS_KV = '''
 <ToolsScreen>:
     name: 'tools'
     MDBoxLayout:
@@ -653,114 +335,367 @@ ScreenManager:
                     theme_text_color: "Custom"
                     text_color: 1, 1, 1, 1
                     font_style: "H6"
+
+            MDCard:
+                radius: [20]
+                md_bg_color: 0.15, 0.15, 0.15, 1
+                padding: "20dp"
+                orientation: 'vertical'
+                spacing: "20dp"
+                adaptive_height: True
+
+                MDLabel:
+                    id: storage_out
+                    text: "STORAGE"
+                    theme_text_color: "Custom"
+                    text_color: 0, 1, 0.5, 1
+                    bold: True
+                    halign: "center"
+                    adaptive_height: True
+
+                MDRaisedButton:
+                    id: storage_btn
+                    text: "SWITCH TO SQLITE"
+                    size_hint_x: 1
+                    md_bg_color: 0, 1, 0.5, 1
+                    text_color: 0, 0, 0, 1
+                    on_release: root.use_sqlite()
             
             Widget:
 '''
 
-class HomeScreen(MDScreen): pass
+def today_text():
+    if not engine.program: return "PLANNING..."
+    session = engine.session_for()
+    if not session: return "REST DAY"
+    return f"TODAY: {session['mode'].upper()} - WEEK {session['week']}" + (" DELOAD" if session["deload"] else "")
+
+# Home grid per MODE_CATALOG section: its colour and its rows as (cols, height,
+# spacing) top to bottom; the last layout repeats for the remaining cards
+HOME_LAYOUT = {
+    "PHAT SYSTEM": ((0, 1, 0.5, 1), ((2, 110, 15), (3, 90, 10))),
+    "SPECIALTY": ((1, 0.7, 0, 1), ((3, 90, 10),)),
+    "CONDITIONING": ((0, 0.8, 1, 1), ((2, 80, 10),)),
+    "RECOVERY": ((0.5, 0.5, 1, 1), ((3, 80, 10),)),
+}
+for _card in MODE_CATALOG:
+    if _card.section not in HOME_LAYOUT: raise ValueError(f"HOME_LAYOUT: no layout for section {_card.section!r}")
+
+def home_rows():
+    # Flattens MODE_CATALOG into RecycleView rows: headers and rows of cards
+    rows = [{"viewclass": "WelcomeCard", "height": dp(80)},
+            {"viewclass": "TodayCard", "text": today_text(), "height": dp(90)}]
+    sections = {}
+    for card in MODE_CATALOG: sections.setdefault(card.section, []).append(card)
+    for title, cards in sections.items():
+        color, grids = HOME_LAYOUT[title]
+        rows.append({"viewclass": "SectionHeader", "text": title, "text_color": color, "height": dp(24)})
+        i = n = 0
+        while i < len(cards):
+            cols, height, spacing = grids[min(n, len(grids) - 1)]
+            rows.append({"viewclass": "NavRow", "cols": cols, "height": dp(height), "spacing": dp(spacing),
+                         "cards": [(c.mode, c.label, c.icon, color) for c in cards[i:i + cols]]})
+            i, n = i + cols, n + 1
+    return rows
+
+class NavRow(MDGridLayout):
+    # One recycled row of HomeCards; reuses its card widgets when rebound
+    cards = ListProperty()
+
+    def on_cards(self, row, cards):
+        while len(self.children) < len(cards): self.add_widget(Factory.HomeCard())
+        while len(self.children) > len(cards): self.remove_widget(self.children[0])
+        for card, (mode, label, icon, color) in zip(reversed(self.children), cards):
+            card.mode = mode
+            card.ids.icon.icon, card.ids.icon.text_color = icon, color
+            card.ids.label.text = label
+
+class HomeScreen(MDScreen):
+    def on_kv_post(self, base_widget):
+        self.ids.grid.data = home_rows()
+
+    def on_pre_enter(self):
+        self.ids.grid.data = home_rows()  # the day may have changed
 class ToolsScreen(MDScreen):
     def calc_plate(self):
         self.ids.plate_out.text = calculate_plates(self.ids.plate_in.text)
 
+    def on_pre_enter(self):
+        chosen = engine.settings.get("backend") or engine.backend
+        self.ids.storage_out.text = f"STORAGE: {(engine.backend or '-').upper()}" + (
+            " (SQLITE FROM NEXT START)" if chosen != engine.backend else "")
+        self.ids.storage_btn.disabled = chosen == "sqlite"
+
+    def use_sqlite(self):
+        # The CSV log is migrated by SqliteStore.open on the next start
+        try: engine.set_backend("sqlite")
+        except (OSError, ValueError) as e: Logger.warning(f"IronVault: {e}")
+        self.on_pre_enter()
+
 class GuideScreen(MDScreen):
-    def on_enter(self):
+    built = False  # cards survive across visits until invalidate()
+
+    def on_pre_enter(self):
+        if not self.built: self.build_cards()
+
+    def invalidate(self):
+        # Call after editing GUIDE_DATA; cards are rebuilt on the next visit
+        self.built = False
+
+    def build_cards(self):
         box = self.ids.guide_box
         box.clear_widgets()
         for title, content in GUIDE_DATA.items():
-            card = Builder.load_string('''
-MDCard:
-    orientation: 'vertical'
-    padding: "15dp"
-    spacing: "10dp"
-    radius: [15]
-    md_bg_color: 0.15, 0.15, 0.15, 1
-    size_hint_y: None
-    height: self.minimum_height
-    elevation: 3
-''')
+            card = Factory.GuideCard()
             card.add_widget(MDLabel(text=title, font_style="H6", theme_text_color="Custom", text_color=(0, 1, 0.5, 1), bold=True, size_hint_y=None, height="30dp"))
             card.add_widget(MDLabel(text=content["subtitle"], font_style="Caption", theme_text_color="Custom", text_color=(1, 0.5, 0, 1), size_hint_y=None, height="20dp"))
             card.add_widget(MDLabel(text=content["body"], theme_text_color="Custom", text_color=(0.9, 0.9, 0.9, 1), size_hint_y=None, height="80dp"))
             box.add_widget(card)
+        self.built = True
+
+# Everything the workout card shows, formatted ahead of time
+View = namedtuple("View", "name target hist pr cue icon phase progress weight reps")
+EMPTY_VIEW = View("Loading...", "TARGET: -", "-", "", '"-"', "dumbbell", "WARMUP", 0, "", "")
 
 class WorkoutScreen(MDScreen):
-    ex_name = StringProperty("Loading...")
-    ex_reps = StringProperty("-")
-    ex_hist = StringProperty("-")
-    ex_cue = StringProperty("-")
-    ex_icon = StringProperty("dumbbell")
-    phase = StringProperty("WARMUP")
+    view = ObjectProperty(EMPTY_VIEW)  # one property, so advancing is one update
     timer_txt = StringProperty("")
-    progress = NumericProperty(0)
     
     queue = []
     idx = 0
+    prepared = {}  # idx -> View built off the UI thread during the previous rest
     timer = None
-    sec = 90
-
-    def load(self, playlist):
+    deadline = None  # monotonic() time the current rest ends
+    shown = None     # seconds currently on screen
+    timeline = None  # interval modes: core.Timeline driving the whole session
+    t0 = 0
+    phase_no = None
+    planned = False  # targets come from the cached program, not live suggestions
+    mode = None
+    recorded = False  # pool picks saved; happens on the first logged set
+
+    def load(self, playlist, mode=None, planned=False):
         self.queue = playlist
+        self.planned, self.mode, self.recorded = planned, mode, False
         self.idx = 0
+        self.prepared = {}
+        self.stop_timer()
         self.show()
+        if mode in INTERVAL_MODES and playlist: self.start_intervals(mode)
+
+    def start_intervals(self, mode):
+        # Every phase change is derived from t0, so dropped frames or a short
+        # trip to the background just land on the right phase
+        self.timeline = build_timeline(self.queue, mode)
+        self.t0 = monotonic()
+        self.tick()
+
+    def interval_tick(self):
+        t = monotonic() - self.t0
+        i = phase_index(self.timeline, t)
+        if i is None:
+            self.exit()
+            return
+        ph = self.timeline.phases[i]
+        if i != self.phase_no:
+            self.phase_no = i
+            if ph.idx != self.idx:
+                self.idx = ph.idx
+                self.show()
+            self.view = self.view._replace(phase=ph.label)
+        left = ph.end - t
+        shown = math.ceil(left)
+        if shown != self.shown:
+            self.shown = shown
+            self.timer_txt = f"{ph.label}: {shown}s"
+        self.timer = Clock.schedule_once(self.tick, left - (shown - 1))
+
+    def build_view(self, idx, fresh=True):
+        # fresh=False uses the history captured by generate, so it never touches storage
+        data = self.queue[idx]
+        hist, tip = data.history, data.suggest
+        target, weight, reps, pr = "TARGET: " + data.reps, "", "", ""
+        if data.type == "WORKOUT":
+            if fresh: hist = engine.get_history(data.name)
+            # May run on the prefetch thread: save_log mutates the stats under
+            # queue_lock, so read them under it too
+            with engine.queue_lock:
+                # Planned targets win; slots the plan has no load for get the live one
+                if fresh and not (self.planned and tip): tip = engine.suggest(data)
+                pr = engine.stats.pr_text(data.name)
+            last = engine.last_sets.get(data.name)
+            if tip:
+                weight, reps = f"{tip.weight:g}", str(tip.reps)
+                target += f" @ {weight}kg ({tip.note})"
+            elif last:
+                weight = last[0]
+        return View(data.name, target, hist, pr, f'"{data.cue}"', data.icon, data.type,
+                    idx / len(self.queue) * 100, weight, reps)
+
+    def prefetch(self, idx):
+        if idx < len(self.queue):
+            queue = self.queue
+            view = self.build_view(idx)
+            if queue is self.queue: self.prepared[idx] = view
 
     def show(self):
         if self.idx < len(self.queue):
-            data = self.queue[self.idx]
-            self.ex_name = data["name"]
-            self.ex_reps = data["reps"]
-            self.ex_cue = data.get("cue", "")
-            self.ex_hist = data.get("history", "-")
-            self.ex_icon = data.get("icon", "dumbbell")
-            self.phase = data.get("type", "WORKOUT")
-            self.progress = (self.idx / len(self.queue)) * 100
-            self.ids.w_input.text = ""
-            self.ids.r_input.text = ""
-            self.stop_timer()
+            self.view = self.prepared.pop(self.idx, None) or self.build_view(self.idx, fresh=False)
+            self.ids.w_input.text = self.view.weight
+            self.ids.r_input.text = self.view.reps
+            threading.Thread(target=self.prefetch, args=(self.idx + 1,), daemon=True).start()
         else:
             self.exit()
 
     def next(self):
         w, r = self.ids.w_input.text, self.ids.r_input.text
-        if w and r: engine.save_log(self.ex_name, w, r)
-        self.start_timer()
+        if w and r:
+            engine.save_log(self.view.name, w, r)
+            if not self.recorded:
+                engine.record_session(self.mode, self.queue)
+                self.recorded = True
+            nxt = self.prepared.pop(self.idx + 1, None)
+            if nxt and nxt.name != self.view.name: self.prepared[self.idx + 1] = nxt
+        if self.timeline: return  # the interval clock advances on its own
+        self.start_timer(rest_seconds(self.queue[self.idx]))
         if self.idx < len(self.queue) - 1:
             self.idx += 1
-            Clock.schedule_once(lambda dt: self.show(), 0.5)
+            self.show()
         else:
             self.exit()
 
-    def start_timer(self):
+    def start_timer(self, seconds):
+        # The display is derived from one deadline, so late or dropped frames
+        # can't make the rest drift
         self.stop_timer()
-        self.sec = 90
-        self.timer = Clock.schedule_interval(self.tick, 1)
+        if seconds <= 0: return
+        self.deadline = monotonic() + seconds
+        self.tick()
+
+    def tick(self, *args):
+        # Wakes only when the shown second is due to change
+        self.timer = None
+        if self.timeline: return self.interval_tick()
+        if self.deadline is None: return
+        left = self.deadline - monotonic()
+        if left <= 0:
+            self.stop_timer()
+            return
+        shown = math.ceil(left)
+        if shown != self.shown:
+            self.shown = shown
+            self.timer_txt = f"REST: {shown}s"
+        self.timer = Clock.schedule_once(self.tick, left - (shown - 1))
+
+    def pause_timer(self):
+        # Keeps the deadline; nothing is scheduled while the app is in the background
+        if self.timer: self.timer.cancel()
+        self.timer = None
 
-    def tick(self, dt):
-        self.sec -= 1
-        self.timer_txt = f"REST: {self.sec}s"
-        if self.sec <= 0: self.stop_timer()
+    def resume_timer(self):
+        if self.deadline is not None or self.timeline: self.tick()
 
     def stop_timer(self):
         if self.timer: self.timer.cancel()
+        self.timer = self.deadline = self.shown = self.timeline = self.phase_no = None
         self.timer_txt = ""
 
     def exit(self):
         self.stop_timer()
-        MDApp.get_running_app().root.current = 'home'
+        engine.flush_async()
+        app = MDApp.get_running_app()
+        if app.sync: app.sync.kick()
+        app.root.current = 'home'
+
+# name -> (KV rules, screen class); built on first navigation or in idle frames
+LAZY_SCREENS = {
+    "workout": (WORKOUT_KV, WorkoutScreen),
+    "guide": (GUIDE_KV, GuideScreen),
+    "tools": (TOOLS_KV, ToolsScreen),
+}
+
+STARTUP_TIMES = {}  # phase -> milliseconds, reported once the first frame is up
+
+def mark(phase, since):
+    now = time.perf_counter()
+    STARTUP_TIMES[phase] = round((now - since) * 1000, 1)
+    return now
 
 class IronVaultApp(MDApp):
+    sync = None  # sync.SyncClient once storage is up, if a sync URL is configured
+
     def build(self):
+        t = mark("imports", _T0)
         self.theme_cls.theme_style = "Dark"
         self.theme_cls.primary_palette = "LightGreen" 
+        threading.Thread(target=self.init_storage, daemon=True).start()
+        Builder.load_string(KV)
+        t = mark("kv_parse", t)
+        sm = ScreenManager()
+        sm.add_widget(HomeScreen())
+        mark("screen_build", t)
+        return sm
+
+    def init_storage(self):
+        t = time.perf_counter()
         engine.init_storage(self.user_data_dir)
-        return Builder.load_string(KV)
+        mark("storage_init", t)
+        Logger.info(f"IronVault: storage_init={STARTUP_TIMES['storage_init']}ms")
+        engine.ensure_program()
+        from sync import start_sync  # pulls in requests; kept off the cold-start path
+        self.sync = start_sync(engine)
+        Clock.schedule_once(lambda dt: self.root.get_screen('home').on_pre_enter())
+
+    def on_start(self):
+        mark("first_frame", _T0)
+        Logger.info("IronVault: startup " + " ".join(f"{k}={v}ms" for k, v in STARTUP_TIMES.items()))
+        Clock.schedule_once(lambda dt: self.prebuild(list(LAZY_SCREENS)), 0.5)
+
+    def prebuild(self, names):
+        # One screen per frame so the home screen stays responsive
+        if not names: return
+        name = names.pop(0)
+        screen = self.screen(name)
+        if name == 'guide' and not screen.built: screen.build_cards()
+        Clock.schedule_once(lambda dt: self.prebuild(names), 0)
+
+    def screen(self, name):
+        if not self.root.has_screen(name):
+            kv, cls = LAZY_SCREENS[name]
+            Builder.load_string(kv)
+            self.root.add_widget(cls())
+        return self.root.get_screen(name)
+
+    def on_pause(self):
+        engine.flush()
+        if self.root.has_screen('workout'): self.root.get_screen('workout').pause_timer()
+        return True
+
+    def on_resume(self):
+        if self.root.has_screen('workout'): self.root.get_screen('workout').resume_timer()
+
+    def on_stop(self):
+        engine.flush()
+        if self.sync: self.sync.stop()
+
+    def start_today(self):
+        session = engine.todays_session()
+        if not session: return
+        mode, playlist = session
+        self.screen('workout').load(playlist, mode, planned=True)
+        self.root.current = 'workout'
 
     def start_workout(self, mode):
-        self.root.get_screen('workout').load(engine.generate(mode))
+        self.screen('workout').load(engine.generate(mode), mode)
         self.root.current = 'workout'
 
-    def open_guide(self): self.root.current = 'guide'
-    def open_tools(self): self.root.current = 'tools'
+    def open_guide(self): self.show_screen('guide')
+    def open_tools(self): self.show_screen('tools')
     def back_home(self): self.root.current = 'home'
 
+    def show_screen(self, name):
+        self.screen(name)
+        self.root.current = name
+
 if __name__ == '__main__':
     IronVaultApp().run()
@@ -0,0 +1,168 @@
+"""Background upload of new log rows to a remote endpoint.
+
+Each pass asks the engine for the rows after the last acknowledged cursor
+(AppEngine.changes_since), SYNC_BATCH at a time. Each batch is gzipped into one
+JSON POST and, once the server answers 2xx, the cursor after it is stored in
+iron_sync.json. Nothing here runs on the UI thread; a failed batch keeps the
+old cursor so the same rows go next time.
+After import_logs re-sorts the log the whole history is sent again from index
+0, so the receiver must dedupe rows by content.
+
+Sync is off until a URL is set: "url" in iron_sync.json or IRONVAULT_SYNC_URL.
+benchmarks/sync_check.py runs a client against a local receiver with that
+contract.
+
+    python sync.py DIR [URL]   # one pass
+"""
+import os
+import sys
+import gzip
+import json
+import uuid
+import random
+import logging
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+try: import requests
+except ImportError: requests = None
+
+from core import AppEngine
+
+SYNC_INTERVAL = 300.0  # seconds between passes while the app runs
+SYNC_TIMEOUT = 20.0    # per request
+SYNC_RETRIES = 5       # attempts per pass before waiting for the next one
+BACKOFF_BASE = 2.0     # first retry delay; doubles per attempt, plus jitter
+BACKOFF_MAX = 120.0
+SYNC_BATCH = 5000      # rows per request
+
+log = logging.getLogger("IronVault.sync")
+
+class RetryableError(Exception): pass
+
+class HttpSession:
+    # Fallback when requests isn't available: one keep-alive http.client
+    # connection, reopened after any error
+    def __init__(self):
+        self.conn = self.netloc = None
+
+    def post(self, url, data, headers, timeout):
+        parts = urlsplit(url)
+        if self.conn is None or self.netloc != parts.netloc:
+            self.close()
+            cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+            self.conn, self.netloc = cls(parts.netloc, timeout=timeout), parts.netloc
+        try:
+            target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+            self.conn.request("POST", target, body=data, headers=headers)
+            resp = self.conn.getresponse()
+            resp.read()
+            return resp.status
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+
+    def close(self):
+        if self.conn: self.conn.close()
+        self.conn = None
+
+class RequestsSession:
+    # requests.Session pools the connection across passes
+    def __init__(self):
+        self.session = requests.Session()
+
+    def post(self, url, data, headers, timeout):
+        try: return self.session.post(url, data=data, headers=headers, timeout=timeout).status_code
+        except requests.RequestException as e: raise OSError(str(e)) from None
+
+    def close(self): self.session.close()
+
+class SyncClient:
+    def __init__(self, engine, url=None, session=None, backoff=BACKOFF_BASE):
+        self.engine = engine
+        self.backoff = backoff  # first retry delay
+        self.path = os.path.join(engine.dir, 'iron_sync.json')
+        try:
+            with open(self.path) as f: self.state = json.load(f)
+        except (OSError, ValueError): self.state = {}
+        self.state.setdefault("device", uuid.uuid4().hex)
+        self.url = url or self.state.get("url") or os.environ.get("IRONVAULT_SYNC_URL")
+        self.session = session or (RequestsSession() if requests else HttpSession())
+        self.stop_event = threading.Event()
+        self.wake = threading.Event()
+        self.thread = None
+
+    def sync_once(self):
+        # One pass: returns the number of rows uploaded. Raises after SYNC_RETRIES
+        # failed attempts at a batch; batches already acknowledged stay committed.
+        self.engine.flush()
+        sent = 0
+        while not self.stop_event.is_set():
+            cursor = self.state.get("cursor")
+            rows, new_cursor = self.engine.changes_since(cursor, SYNC_BATCH)
+            if rows:
+                # "from" is the log index of the first row; it restarts at 0 after a merge
+                body = {"device": self.state["device"], "from": new_cursor["rows"] - len(rows), "rows": rows}
+                self.post(gzip.compress(json.dumps(body).encode()))
+                sent += len(rows)
+            if rows or new_cursor != cursor:
+                self.state["cursor"] = new_cursor
+                self.save()
+            if len(rows) < SYNC_BATCH: break
+        return sent
+
+    def post(self, data):
+        headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+        for attempt in range(SYNC_RETRIES):
+            try:
+                status = self.session.post(self.url, data, headers, SYNC_TIMEOUT)
+                if status < 300: return
+                # 4xx other than 429 won't get better by resending
+                if 400 <= status < 500 and status != 429: raise ValueError(f"sync rejected: HTTP {status}")
+                error = RetryableError(f"HTTP {status}")
+            except OSError as e: error = RetryableError(str(e))
+            if attempt + 1 < SYNC_RETRIES:
+                delay = min(self.backoff * 2 ** attempt, BACKOFF_MAX)
+                if self.stop_event.wait(delay * random.uniform(0.5, 1.5)): break
+        raise error
+
+    def save(self):
+        try:
+            with open(self.path + '.tmp', 'w') as f: json.dump(self.state, f)
+            os.replace(self.path + '.tmp', self.path)
+        except OSError: pass
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try: self.sync_once()
+            except Exception as e: log.warning("sync failed: %s", e)
+            self.wake.wait(SYNC_INTERVAL)
+            self.wake.clear()
+
+    def kick(self):
+        # Sync soon, e.g. after a workout; never blocks the caller
+        self.wake.set()
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake.set()
+        self.session.close()
+
+def start_sync(engine, url=None):
+    # The running client, or None while no URL is configured
+    client = SyncClient(engine, url)
+    return client.start() if client.url else None
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2: sys.exit("usage: sync.py DIR [URL]")
+    eng = AppEngine()
+    eng.init_storage(sys.argv[1])
+    client = SyncClient(eng, sys.argv[2] if len(sys.argv) > 2 else None)
+    if not client.url: sys.exit("no sync URL configured")
+    print(f"{client.sync_once()} rows uploaded")